@@ -6,31 +6,69 @@ https://github.com/pve84/eldom
 """
 import asyncio
 import logging
+import time
 from datetime import timedelta
+from urllib.parse import urlsplit
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.const import CONF_USERNAME
+from homeassistant.core import callback
 from homeassistant.core import Config
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .api import BASE_URL
 from .api import EldomApiClient
+from .api import EldomApiClientError
+from .commands import EldomCommandQueue
 from .const import CONF_ACCESS_TOKEN
 from .const import CONF_DEVICE_ID
+from .const import CONF_DEVICES
+from .const import CONF_FRIENDLY_NAME
+from .const import CONF_GRACE_PERIOD
+from .const import CONF_MAX_INTERVAL
+from .const import CONF_MIN_INTERVAL
+from .const import CONF_POLL_RATE
 from .const import CONF_UNIQUE_ID
+from .const import CONF_WRITE_RATE
+from .const import DEFAULT_GRACE_PERIOD
+from .const import DEFAULT_MAX_INTERVAL
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_NAME
+from .const import DEFAULT_POLL_RATE
+from .const import DEFAULT_WRITE_RATE
 from .const import DOMAIN
 from .const import PLATFORMS
+from .const import SENSOR
 from .const import STARTUP_MESSAGE
-
-SCAN_INTERVAL = timedelta(seconds=30)
+from .credentials import async_get_credentials
+from .credentials import EldomCredentials
+from .device_index import async_get_device_index
+from .history import EldomHistory
+from .limiter import get_limiter
+from .priority import PRIORITY_CONFIRM
+from .priority import PRIORITY_POLL
+from .scheduler import AdaptivePollInterval
+from .services import async_setup_services
+from .session import async_get_session
+from .snapshot import EldomSnapshot
+from .snapshot_store import async_get_snapshot_store
+from .snapshot_store import EldomSnapshotStore
+from .stagger import async_get_stagger
+from .stagger import PollStagger
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
 async def async_setup(hass: HomeAssistant, config: Config):
     """Set up this integration using YAML is not supported."""
+    async_setup_services(hass)
     return True
 
 
@@ -40,32 +78,184 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         hass.data.setdefault(DOMAIN, {})
         _LOGGER.info(STARTUP_MESSAGE)
 
-    token = entry.data.get(CONF_ACCESS_TOKEN)
-    uuid = entry.data.get(CONF_UNIQUE_ID)
-    deviceId = entry.data.get(CONF_DEVICE_ID)
+    session = await async_get_session(hass)
+    credentials = async_get_credentials(
+        hass,
+        session,
+        entry.data[CONF_USERNAME],
+        entry.data[CONF_PASSWORD],
+        entry.data.get(CONF_ACCESS_TOKEN),
+    )
+    get_limiter(entry.data[CONF_USERNAME], urlsplit(BASE_URL).hostname).configure(
+        entry.options.get(CONF_POLL_RATE, DEFAULT_POLL_RATE),
+        entry.options.get(CONF_WRITE_RATE, DEFAULT_WRITE_RATE),
+    )
+    devices = await _async_entry_devices(hass, entry, session, credentials)
+
+    await _async_migrate_unique_ids(hass, entry, devices)
 
-    session = async_get_clientsession(hass)
-    client = EldomApiClient(session=session, token=token, uuid=uuid, deviceId=deviceId)
+    hub = EldomHub(
+        hass,
+        session=session,
+        credentials=credentials,
+        devices=devices,
+        store=await async_get_snapshot_store(hass),
+        stagger=async_get_stagger(hass),
+        min_interval=timedelta(
+            seconds=entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)
+        ),
+        max_interval=timedelta(
+            seconds=entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+        ),
+        grace_period=timedelta(
+            seconds=entry.options.get(CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD)
+        ),
+    )
 
-    coordinator = EldomDataUpdateCoordinator(hass, client=client)
-    await coordinator.async_refresh()
+    # Heaters with a last known snapshot come up right away, marked stale,
+    # and are first polled on their phase. Only the others hold up setup.
+    restored = hub.async_restore()
+    await hub.async_refresh(
+        [
+            coordinator
+            for coordinator in hub.coordinators.values()
+            if coordinator not in restored
+        ]
+    )
 
-    if not coordinator.last_update_success:
+    if not hub.last_update_success:
+        hub.async_unload()
         raise ConfigEntryNotReady
 
-    hass.data[DOMAIN][entry.entry_id] = coordinator
+    hass.data[DOMAIN][entry.entry_id] = hub
 
-    for platform in PLATFORMS:
-        if entry.options.get(platform, True):
-            coordinator.platforms.append(platform)
-            hass.async_add_job(
-                hass.config_entries.async_forward_entry_setup(entry, platform)
-            )
+    hub.platforms = [
+        platform for platform in PLATFORMS if entry.options.get(platform, True)
+    ]
+    hass.config_entries.async_setup_platforms(entry, hub.platforms)
 
     entry.add_update_listener(async_reload_entry)
     return True
 
 
+async def _async_entry_devices(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    session,
+    credentials: EldomCredentials,
+) -> list:
+    """Return the heaters covered by a config entry."""
+    devices = entry.data.get(CONF_DEVICES)
+    if devices is not None:
+        # Pick up heaters added to the account since the entry was created,
+        # without repeating the discovery while the device index is fresh.
+        index = await async_get_device_index(hass)
+        client = EldomApiClient(session=session, credentials=credentials)
+        return (
+            await index.async_get_devices(entry.data[CONF_USERNAME], client) or devices
+        )
+    # Entries created before hub mode cover a single heater, and stored its
+    # name under Home Assistant's "friendly_name" key.
+    return [
+        {
+            CONF_UNIQUE_ID: entry.data.get(CONF_UNIQUE_ID),
+            CONF_DEVICE_ID: entry.data.get(CONF_DEVICE_ID),
+            CONF_FRIENDLY_NAME: entry.data.get("friendly_name", DEFAULT_NAME),
+        }
+    ]
+
+
+async def _async_migrate_unique_ids(
+    hass: HomeAssistant, entry: ConfigEntry, devices: list
+) -> None:
+    """Move single-heater entities from the entry id to the heater uuid."""
+    if CONF_DEVICES in entry.data:
+        return
+    uuid = devices[0][CONF_UNIQUE_ID]
+
+    @callback
+    def _migrate(entity_entry: er.RegistryEntry):
+        if entity_entry.unique_id != entry.entry_id:
+            return None
+        if entity_entry.domain == SENSOR:
+            return {"new_unique_id": f"{uuid}_temperature"}
+        return {"new_unique_id": uuid}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate)
+
+
+class EldomHub:
+    """Class to poll every heater of an account."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session,
+        credentials: EldomCredentials,
+        devices: list,
+        store: EldomSnapshotStore,
+        stagger: PollStagger,
+        min_interval: timedelta,
+        max_interval: timedelta,
+        grace_period: timedelta = timedelta(seconds=DEFAULT_GRACE_PERIOD),
+    ) -> None:
+        """Initialize."""
+        self.platforms = []
+        self._store = store
+        self._stagger = stagger
+        self.coordinators = {}
+        for device in devices:
+            client = EldomApiClient(
+                session=session,
+                credentials=credentials,
+                uuid=device[CONF_UNIQUE_ID],
+                deviceId=device[CONF_DEVICE_ID],
+            )
+            self.coordinators[device[CONF_UNIQUE_ID]] = EldomDataUpdateCoordinator(
+                hass,
+                client=client,
+                device=device,
+                stagger=stagger,
+                scheduler=AdaptivePollInterval(min_interval, max_interval),
+                store=store,
+                grace_period=grace_period,
+            )
+
+    @property
+    def last_update_success(self) -> bool:
+        """Return True if at least one heater could be polled."""
+        return any(
+            coordinator.last_update_success
+            for coordinator in self.coordinators.values()
+        )
+
+    @callback
+    def async_restore(self) -> list:
+        """Serve the last known snapshots, and return the restored coordinators."""
+        restored = []
+        for uuid, coordinator in self.coordinators.items():
+            last = self._store.get(uuid)
+            if last is not None:
+                coordinator.async_restore(*last)
+                restored.append(coordinator)
+        return restored
+
+    @callback
+    def async_unload(self) -> None:
+        """Give the phases of the heaters back to the stagger."""
+        for uuid, coordinator in self.coordinators.items():
+            self._stagger.unregister(uuid)
+            coordinator.async_cancel_grace()
+
+    async def async_refresh(self, coordinators: list = None) -> None:
+        """Refresh heaters, all by default, bounded by the global poll limit."""
+        if coordinators is None:
+            coordinators = self.coordinators.values()
+        await asyncio.gather(
+            *[coordinator.async_refresh() for coordinator in coordinators]
+        )
+
+
 class EldomDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
 
@@ -73,51 +263,184 @@ class EldomDataUpdateCoordinator(DataUpdateCoordinator):
         self,
         hass: HomeAssistant,
         client: EldomApiClient,
+        device: dict,
+        stagger: PollStagger,
+        scheduler: AdaptivePollInterval,
+        store: EldomSnapshotStore = None,
+        grace_period: timedelta = timedelta(seconds=DEFAULT_GRACE_PERIOD),
     ) -> None:
         """Initialize."""
         self.api = client
-        self.platforms = []
+        self.device = device
+        self._stagger = stagger
+        self._scheduler = scheduler
+        self._store = store
+        self._grace_period = grace_period
+        self.commands = EldomCommandQueue(hass, self)
+        self.changed_fields = frozenset()
+        self._confirming = False
+        self.history = EldomHistory(scheduler.minimum.total_seconds())
+        # True while serving a snapshot restored from storage, or kept after
+        # failed polls.
+        self.stale = False
+        self.last_updated = None
+        self._unsub_grace = None
+
+        stagger.register(device[CONF_UNIQUE_ID])
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{device[CONF_FRIENDLY_NAME]}",
+            update_interval=scheduler.minimum,
+        )
+
+    @property
+    def unique_id(self) -> str:
+        """Return the uuid of the polled heater."""
+        return self.device[CONF_UNIQUE_ID]
+
+    @property
+    def available(self) -> bool:
+        """Return True while the data is fresh, or stale within the grace period."""
+        if self.last_update_success:
+            return self.data is not None
+        return (
+            self.last_updated is not None
+            and dt_util.utcnow() - self.last_updated < self._grace_period
+        )
+
+    def _on_phase(self, interval: timedelta) -> timedelta:
+        """Push a poll interval to the next poll time of this heater."""
+        return timedelta(
+            seconds=self._stagger.delay(
+                self.unique_id,
+                interval.total_seconds(),
+                self._scheduler.minimum.total_seconds(),
+            )
+        )
+
+    @callback
+    def _async_schedule_grace(self) -> None:
+        """Write the entity states once the stale data outlives the grace period.
+
+        Listeners only run on the first of several failed refreshes, so the
+        end of the grace period would otherwise go unnoticed.
+        """
+        if self.last_updated is None or self._unsub_grace is not None:
+            return
+        expires = self.last_updated + self._grace_period - dt_util.utcnow()
+        self._unsub_grace = async_call_later(
+            self.hass, max(expires.total_seconds(), 0), self._async_grace_expired
+        )
+
+    @callback
+    def _async_grace_expired(self, _now) -> None:
+        self._unsub_grace = None
+        # Only the availability changed.
+        self.changed_fields = frozenset()
+        for update_callback in list(self._listeners):
+            update_callback()
 
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+    @callback
+    def async_cancel_grace(self) -> None:
+        """Cancel the end of the grace period, after a poll or on unload."""
+        if self._unsub_grace is not None:
+            self._unsub_grace()
+            self._unsub_grace = None
+
+    @callback
+    def command_sent(self) -> None:
+        """Follow a command sent to the heater with fast polls."""
+        self._confirming = True
+        self._scheduler.command_sent()
+        self.update_interval = self._scheduler.minimum
+
+    @callback
+    def async_restore(self, data: EldomSnapshot, updated: float) -> None:
+        """Serve a snapshot restored from storage until the first poll.
+
+        The first poll runs on the phase of the heater, so that restored
+        heaters do not all poll at once.
+        """
+        self.data = data
+        self.stale = True
+        self.last_updated = dt_util.utc_from_timestamp(updated)
+        self.update_interval = self._on_phase(timedelta())
+
+    @callback
+    def _async_remember(self, data: EldomSnapshot) -> frozenset:
+        """Keep a fresh snapshot, and return the fields it changed."""
+        changed = data.changed_fields(self.data)
+        if self.stale:
+            self.stale = False
+            changed |= {"stale"}
+        self.last_updated = dt_util.utcnow()
+        self.history.append(data)
+        if self._store is not None:
+            self._store.async_set(self.unique_id, data)
+        return changed
+
+    @callback
+    def async_set_updated_data(self, data: EldomSnapshot) -> None:
+        """Update data from a command, and tell entities what changed."""
+        self.async_cancel_grace()
+        self.changed_fields = self._async_remember(data)
+        super().async_set_updated_data(data)
 
     async def _async_update_data(self):
         """Get Status"""
+        # The first poll after a command confirms it, ahead of the others,
+        # and without waiting for the background polls of every entry.
+        priority = PRIORITY_CONFIRM if self._confirming else PRIORITY_POLL
+        self._confirming = False
+        calls = self.api.metrics.total("calls")
+        try:
+            if priority == PRIORITY_POLL:
+                async with self._stagger:
+                    return await self._async_poll(priority)
+            return await self._async_poll(priority)
+        finally:
+            self._stagger.record_poll(self.api.metrics.total("calls") - calls)
+
+    async def _async_poll(self, priority: int) -> EldomSnapshot:
+        """Poll the heater, and decode its answer."""
+        start = time.monotonic()
+        version = self.commands.version
+        overlaps_write = self.commands.writing
         try:
-            status = await self.api.async_get_status()
-            parameters = await self.api.async_get_parameters()
-            response = {
-                "T": status["T"],
-                "Operation": status["Operation"],
-                "TSet": parameters["TSet"],
-                "ID": parameters["ID"],
-                "Lock": parameters["Lock"],
-                "Rate1": parameters["Rate1"],
-                "Rate2": parameters["Rate2"],
-                "Antifrost": parameters["Antifrost"],
-                "AutoTimeSet": parameters["AutoTimeSet"],
-                "SystemSettings": parameters["SystemSettings"],
-                "CRC": "00000000",
-                "CID": "1",
-            }
-            return response
-        except Exception as exception:
-            raise UpdateFailed() from exception
+            status, parameters = await self.api.async_get_status_and_parameters(
+                priority
+            )
+            snapshot = EldomSnapshot.from_responses(status, parameters)
+        except (EldomApiClientError, KeyError, ValueError) as exception:
+            self.api.metrics.record_poll(time.monotonic() - start, False)
+            self.update_interval = self._on_phase(self._scheduler.poll_failed())
+            self.changed_fields = frozenset() if self.stale else frozenset({"stale"})
+            self.stale = True
+            self._async_schedule_grace()
+            raise UpdateFailed(str(exception)) from exception
+        self.api.metrics.record_poll(time.monotonic() - start, True)
+        self.async_cancel_grace()
+
+        if self.data is not None and (
+            overlaps_write or self.commands.writing or self.commands.version != version
+        ):
+            # The heater may have answered with the state from before a
+            # write, keep the state the write left instead.
+            _LOGGER.debug("Dropping a poll of %s overlapping a write", self.name)
+            self.changed_fields = frozenset()
+            return self.data
+        self.update_interval = self._on_phase(self._scheduler.next_interval(snapshot))
+        self.changed_fields = self._async_remember(snapshot)
+        return snapshot
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    unloaded = all(
-        await asyncio.gather(
-            *[
-                hass.config_entries.async_forward_entry_unload(entry, platform)
-                for platform in PLATFORMS
-                if platform in coordinator.platforms
-            ]
-        )
-    )
+    hub = hass.data[DOMAIN][entry.entry_id]
+    unloaded = await hass.config_entries.async_unload_platforms(entry, hub.platforms)
     if unloaded:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN].pop(entry.entry_id).async_unload()
 
     return unloaded
 
@@ -126,3 +449,15 @@ async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
     await async_setup_entry(hass, entry)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the cached devices and snapshots of a removed account."""
+    store = await async_get_snapshot_store(hass)
+    if CONF_DEVICES in entry.data:
+        index = await async_get_device_index(hass)
+        devices = index.devices(entry.data[CONF_USERNAME]) or entry.data[CONF_DEVICES]
+        store.async_remove([device[CONF_UNIQUE_ID] for device in devices])
+        await index.async_remove(entry.data[CONF_USERNAME])
+    else:
+        store.async_remove([entry.data.get(CONF_UNIQUE_ID)])
@@ -0,0 +1,127 @@
+"""Poll eldom heaters without Home Assistant, streaming NDJSON.
+
+    python -m custom_components.eldom --username USER --interval 30 > polls.ndjson
+
+The password is read from ELDOM_PASSWORD, or asked for.
+"""
+import argparse
+import asyncio
+import getpass
+import logging
+import os
+import sys
+
+import aiohttp
+
+from .api import BASE_URL
+from .api import EldomApiClientError
+from .const import DEFAULT_MAX_CONCURRENT_POLLS
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_POLL_RATE
+from .poller import EldomPoller
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m custom_components.eldom",
+        description="Poll every heater of an eldom account, one NDJSON line per poll.",
+    )
+    parser.add_argument("--username", default=os.environ.get("ELDOM_USERNAME"))
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument(
+        "--device",
+        action="append",
+        dest="devices",
+        metavar="UUID",
+        help="poll only this heater, may be repeated",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        help="seconds between two polls of a heater, 0 polls back to back",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_POLLS,
+        help="polls in flight at most",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_POLL_RATE,
+        help="requests per second at most",
+    )
+    parser.add_argument(
+        "--count", type=int, help="polls of each heater, polls forever by default"
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("a"),
+        default="-",
+        help="file the records are appended to, stdout by default",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    if not args.username:
+        parser.error("--username or ELDOM_USERNAME is required")
+    if args.interval < 0 or args.concurrency < 1 or args.rate <= 0:
+        parser.error("--interval, --concurrency and --rate must be positive")
+    return args
+
+
+async def async_main(args: argparse.Namespace, password: str) -> int:
+    """Discover the heaters and poll them, return the exit status."""
+    async with aiohttp.ClientSession() as session:
+        poller = EldomPoller(
+            session,
+            args.username,
+            password,
+            args.output,
+            base_url=args.base_url,
+            interval=args.interval,
+            concurrency=args.concurrency,
+            poll_rate=args.rate,
+        )
+        try:
+            devices = await poller.async_discover(args.devices)
+        except EldomApiClientError as exception:
+            _LOGGER.error("Discovery failed: %s", exception)
+            return 1
+        if not devices:
+            _LOGGER.error("No heater to poll")
+            return 1
+        _LOGGER.info("Polling %s heaters", len(devices))
+        try:
+            await poller.async_run(devices, args.count)
+        finally:
+            _LOGGER.info(
+                "%s polls, %s failed, %.2f requests per second",
+                poller.polls,
+                poller.errors,
+                poller.requests_per_second,
+            )
+    return 0
+
+
+def main(argv: list = None) -> int:
+    """Run the poller."""
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+    password = os.environ.get("ELDOM_PASSWORD") or getpass.getpass()
+    try:
+        return asyncio.run(async_main(args, password))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
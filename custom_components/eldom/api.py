@@ -1,18 +1,109 @@
 """Sample API Client."""
 import asyncio
 import logging
+import random
 import socket
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from types import MappingProxyType
+from urllib.parse import urlsplit
 
 import aiohttp
 import async_timeout
 
+from .breaker import get_breaker
+from .codec import DEFAULT_CODEC
+from .limiter import get_limiter
+from .metrics import EldomMetrics
+from .priority import get_request_queue
+from .priority import PRIORITY_POLL
+from .priority import PRIORITY_WRITE
+
 TIMEOUT = 10
+DEVICE_PAGE_SIZE = 10
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5
+ERROR_LOG_INTERVAL = 300
+PARAMETERS_TTL = 3600
+# Endpoints limited by the write rate, the others by the poll rate.
+WRITE_ENDPOINTS = frozenset({"SetParams", "On", "Off"})
 
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
-head = {"Content-type": "application/json; charset=UTF-8"}
+HEADERS = MappingProxyType({"Content-type": "application/json; charset=UTF-8"})
 URL = "iot.myeldom.com/api/"
+BASE_URL = f"https://{URL}"
+
+
+class EldomApiClientError(Exception):
+    """Base class of the errors raised by the API client."""
+
+
+class EldomApiCommunicationError(EldomApiClientError):
+    """Raised on transient failures: network errors, 5xx and 429 answers."""
+
+
+class EldomApiTimeoutError(EldomApiCommunicationError):
+    """Raised when the Eldom cloud does not answer in time."""
+
+
+class EldomApiRateLimitedError(EldomApiCommunicationError):
+    """Raised when the Eldom cloud answers 429, or requests are held back too long."""
+
+    def __init__(self, message: str, retry_after: float = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EldomApiUnavailableError(EldomApiClientError):
+    """Raised without sending anything while the circuit breaker is open."""
+
+
+class EldomApiAuthError(EldomApiClientError):
+    """Raised when the Eldom cloud rejects the account credentials."""
+
+
+class EldomApiResponseError(EldomApiClientError):
+    """Raised when the Eldom cloud refuses a request or answers garbage."""
+
+
+class _ErrorLog:
+    """Log identical errors at most once per ERROR_LOG_INTERVAL."""
+
+    def __init__(self) -> None:
+        self._logged_at = {}
+        self._suppressed = {}
+
+    def error(self, key, message: str, *args) -> None:
+        now = time.monotonic()
+        if now - self._logged_at.get(key, -ERROR_LOG_INTERVAL) < ERROR_LOG_INTERVAL:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            message += " (%s similar errors suppressed)"
+            args += (suppressed,)
+        self._logged_at[key] = now
+        _LOGGER.error(message, *args)
+
+
+_ERROR_LOG = _ErrorLog()
+
+
+def _retry_after(value: str):
+    """Decode a Retry-After header, in seconds or as a date."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
 
 
 class EldomApiClient:
@@ -24,17 +115,53 @@ class EldomApiClient:
         token: str = None,
         uuid: str = None,
         deviceId: str = None,
+        credentials=None,
+        codec=DEFAULT_CODEC,
+        base_url: str = BASE_URL,
     ) -> None:
+        self._base_url = base_url
         self._username = username
         self._password = password
         self._session = session
         self._token = token
+        self._credentials = credentials
+        self._account = credentials.username if credentials is not None else username
         self._uuid = uuid
         self._deviceId = deviceId
+        self._codec = codec
+        self._batch_supported = None
+        self._parameters = None
+        self._parameters_at = None
+        # Bumped by every write, so that parameters fetched across a write
+        # are not cached.
+        self._parameters_generation = 0
+        self.metrics = EldomMetrics()
+
+        # Headers are immutable and shared by every request until the token
+        # changes; the bodies of the fixed requests are encoded only once.
+        self._headers_token = None
+        self._account_headers = None
+        self._device_headers = None
+        self._bodies = {
+            request: codec.dumps(self._direct_request(request))
+            for request in ("GetStatus", "GetParams", "On", "Off")
+        }
+        self._batch_body = codec.dumps(
+            [self._direct_request(request) for request in ("GetStatus", "GetParams")]
+        )
+
+    def _direct_request(self, request: str) -> dict:
+        """Return the body of a direct-req call to the device."""
+        return {
+            "CID": "1",
+            "CRC": "00000000",
+            "ID": self._deviceId,
+            "Req": request,
+        }
 
     async def async_get_token(self) -> dict:
         """Get data from the API."""
-        url = f"https://{URL}authenticate"
+        url = f"{self._base_url}authenticate"
         return await self.api_wrapper(
             "post",
             url,
@@ -43,127 +170,360 @@ class EldomApiClient:
                 "rememberMe": True,
                 "username": f"{self._username}",
             },
-            headers=head,
+            headers=HEADERS,
+            endpoint="authenticate",
         )
 
-    async def async_get_devices(self) -> dict:
-        """Get devices from the API"""
-        url = f"https://{URL}device-list?page=1&size=10"
-        headers = head
-        headers["Authorization"] = f"Bearer {self._token}"
-        headers["ionic-idd"] = "0"
-        return await self.api_wrapper("get", url, headers=headers)
+    async def _async_access_token(self) -> str:
+        """Return the token to send, refreshed ahead of its expiry."""
+        if self._credentials is None:
+            return self._token
+        return await self._credentials.async_get_access_token()
 
-    async def async_get_status(self) -> dict:
-        """Get the status of the device"""
-        url = f"https://{URL}direct-req"
-        headers = head
-        headers["Authorization"] = f"Bearer {self._token}"
-        headers["ionic-idd"] = self._uuid
+    async def _async_headers(self, device: bool = True) -> MappingProxyType:
+        """Return the headers of device or account requests."""
+        token = await self._async_access_token()
+        if token != self._headers_token:
+            authorization = {**HEADERS, "Authorization": f"Bearer {token}"}
+            self._account_headers = MappingProxyType(
+                {**authorization, "ionic-idd": "0"}
+            )
+            if self._uuid is not None:
+                self._device_headers = MappingProxyType(
+                    {**authorization, "ionic-idd": self._uuid}
+                )
+            self._headers_token = token
+        return self._device_headers if device else self._account_headers
+
+    async def async_get_devices(self) -> list:
+        """Get every device of the account from the API"""
+        return [device async for device in self.async_iter_devices()]
+
+    async def async_iter_devices(self, page_size: int = DEVICE_PAGE_SIZE):
+        """Yield the devices of the account, one page of the device list ahead."""
+        page = 1
+        task = asyncio.ensure_future(self._async_get_device_page(page, page_size))
+        try:
+            while task is not None:
+                devices = await task
+                task = None
+                if len(devices) >= page_size:
+                    page += 1
+                    task = asyncio.ensure_future(
+                        self._async_get_device_page(page, page_size)
+                    )
+                for device in devices:
+                    yield device
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def _async_get_device_page(self, page: int, page_size: int) -> list:
+        """Get one page of the device list"""
+        url = f"{self._base_url}device-list?page={page}&size={page_size}"
+        headers = await self._async_headers(device=False)
         return await self.api_wrapper(
-            "post",
-            url,
-            data={
-                "CID": "1",
-                "CRC": "00000000",
-                "ID": self._deviceId,
-                "Req": "GetStatus",
-            },
-            headers=headers,
+            "get", url, headers=headers, endpoint="device-list"
         )
 
-    async def async_get_parameters(self) -> dict:
+    async def async_get_status(self, priority: int = PRIORITY_POLL) -> dict:
         """Get the status of the device"""
-        url = f"https://{URL}direct-req"
-        headers = head
-        headers["Authorization"] = f"Bearer {self._token}"
-        headers["ionic-idd"] = self._uuid
+        url = f"{self._base_url}direct-req"
+        headers = await self._async_headers()
         return await self.api_wrapper(
             "post",
             url,
-            data={
-                "CID": "1",
-                "CRC": "00000000",
-                "ID": self._deviceId,
-                "Req": "GetParams",
-            },
+            data=self._bodies["GetStatus"],
             headers=headers,
+            endpoint="GetStatus",
+            priority=priority,
         )
 
-    async def async_turn_on_or_off(self, value: str) -> dict:
-        """Get the status of the device"""
-        url = f"https://{URL}direct-req"
-        headers = head
-        headers["Authorization"] = f"Bearer {self._token}"
-        headers["ionic-idd"] = self._uuid
+    async def async_get_parameters(self, priority: int = PRIORITY_POLL) -> dict:
+        """Get the parameters of the device"""
+        url = f"{self._base_url}direct-req"
+        headers = await self._async_headers()
         return await self.api_wrapper(
             "post",
             url,
-            data={
-                "CID": "1",
-                "CRC": "00000000",
-                "ID": self._deviceId,
-                "Req": value,
-            },
+            data=self._bodies["GetParams"],
             headers=headers,
+            endpoint="GetParams",
+            priority=priority,
         )
 
+    def invalidate_parameters(self) -> None:
+        """Fetch the parameters again on the next poll."""
+        self._parameters = None
+        self._parameters_generation += 1
+
+    def _cache_parameters(self, parameters: dict, generation: int) -> None:
+        """Cache parameters, unless a write happened since they were requested."""
+        if generation == self._parameters_generation:
+            self._parameters = parameters
+            self._parameters_at = time.monotonic()
+
+    async def async_get_status_and_parameters(
+        self, priority: int = PRIORITY_POLL
+    ) -> tuple:
+        """Get the status and the parameters of the device in one poll cycle.
+
+        The status is fetched on every poll. The parameters only change when
+        written, so they are cached for PARAMETERS_TTL, or until a write
+        invalidates them. A batched request is tried first; if the device
+        does not answer it, the two requests are sent concurrently from then
+        on. priority ranks the requests among the others of the account.
+        """
+        if (
+            self._parameters is not None
+            and time.monotonic() - self._parameters_at < PARAMETERS_TTL
+        ):
+            return await self.async_get_status(priority), self._parameters
+
+        generation = self._parameters_generation
+        if self._batch_supported is not False:
+            response = await self._async_get_batched(priority)
+            if response is not None and (
+                "T" not in response[0] or "TSet" not in response[1]
+            ):
+                response = None
+            self._batch_supported = response is not None
+            if response is not None:
+                status, parameters = response
+                self._cache_parameters(parameters, generation)
+                return status, parameters
+
+        status, parameters = await asyncio.gather(
+            self.async_get_status(priority), self.async_get_parameters(priority)
+        )
+        self._cache_parameters(parameters, generation)
+        return status, parameters
+
+    async def _async_get_batched(self, priority: int):
+        """Get status and parameters in one call, None if batching is unsupported.
+
+        Until the device answered a batch once, any failure of the batch
+        means it is unsupported.
+        """
+        url = f"{self._base_url}direct-req"
+        headers = await self._async_headers()
+        speculative = self._batch_supported is None
+        try:
+            response = await self.api_wrapper(
+                "post",
+                url,
+                data=self._batch_body,
+                headers=headers,
+                endpoint="GetStatus+GetParams",
+                priority=priority,
+                speculative=speculative,
+            )
+        except EldomApiResponseError:
+            return None
+        except EldomApiCommunicationError:
+            if speculative:
+                return None
+            raise
+        if not isinstance(response, list) or len(response) != 2:
+            return None
+        if not all(isinstance(item, dict) for item in response):
+            return None
+        return response
+
+    async def async_turn_on_or_off(self, value: str) -> dict:
+        """Turn the device on or off"""
+        url = f"{self._base_url}direct-req"
+        headers = await self._async_headers()
+        data = self._bodies.get(value) or self._direct_request(value)
+        self.invalidate_parameters()
+        try:
+            return await self.api_wrapper(
+                "post", url, data=data, headers=headers, endpoint=value
+            )
+        finally:
+            self.invalidate_parameters()
+
     async def async_set_parameter(self, value: dict) -> dict:
         """Set a parameter"""
-        url = f"https://{URL}direct-req"
-        headers = head
-        headers["Authorization"] = f"Bearer {self._token}"
-        headers["ionic-idd"] = self._uuid
-        return await self.api_wrapper(
-            "post",
-            url,
-            data=value,
-            headers=headers,
-        )
+        url = f"{self._base_url}direct-req"
+        headers = await self._async_headers()
+        self.invalidate_parameters()
+        try:
+            return await self.api_wrapper(
+                "post", url, data=value, headers=headers, endpoint="SetParams"
+            )
+        finally:
+            self.invalidate_parameters()
 
     async def api_wrapper(
-        self, method: str, url: str, data: dict = {}, headers: dict = {}
+        self,
+        method: str,
+        url: str,
+        data=None,
+        headers: dict = HEADERS,
+        reauthenticate: bool = True,
+        endpoint: str = None,
+        priority: int = None,
+        speculative: bool = False,
     ) -> dict:
-        """Get information from the API."""
-        try:
-            async with async_timeout.timeout(TIMEOUT, loop=asyncio.get_event_loop()):
-                if method == "get":
-                    response = await self._session.get(url, headers=headers, ssl=False)
-                    _LOGGER.info(await response.json())
-                    return await response.json()
-
-                elif method == "put":
-                    await self._session.put(url, headers=headers, json=data, ssl=False)
-
-                elif method == "patch":
-                    await self._session.patch(
-                        url, headers=headers, json=data, ssl=False
-                    )
+        """Get information from the API.
+
+        data is sent as is when it is already encoded, and through the codec
+        otherwise. Transient failures are retried with a jittered exponential
+        backoff, a 401 is retried once with a refreshed token, and requests
+        are refused while the circuit breaker of the host is open. Every
+        attempt waits for the rate limiter of the account, which slows down
+        on 429 answers, then for a slot of the request queue of the account:
+        writes and authentication go first, polls default to the lowest
+        priority, and identical queued polls are sent once. Writes wait for
+        the limiter as long as it takes; other requests give up with
+        EldomApiRateLimitedError rather than wait longer than TIMEOUT. The
+        TIMEOUT deadline of each attempt only starts once it is sent. Calls,
+        errors, timeouts, retries and latencies are counted per endpoint.
+        A speculative request, one the host may not support, is neither
+        retried nor held against the host by the breaker when it fails.
+        """
+        if data is not None and not isinstance(data, bytes):
+            data = self._codec.dumps(data)
+        host = urlsplit(url).hostname
+        breaker = get_breaker(host)
+        limiter = get_limiter(self._account, host)
+        queue = get_request_queue(self._account, host)
+        write = endpoint in WRITE_ENDPOINTS
+        if priority is None:
+            priority = (
+                PRIORITY_WRITE if write or endpoint == "authenticate" else PRIORITY_POLL
+            )
+        key = None
+        if priority != PRIORITY_WRITE:
+            key = (method, url, data, headers.get("ionic-idd"))
+        metrics = self.metrics.endpoint(endpoint or urlsplit(url).path)
+        attempt = 0
+        while True:
+            if (
+                await limiter.async_acquire(
+                    write=write, max_wait=None if write else TIMEOUT
+                )
+                is None
+            ):
+                metrics.errors += 1
+                raise EldomApiRateLimitedError(
+                    f"Requests to {host} are throttled", limiter.paused_for
+                )
+            if not breaker.allow_request():
+                metrics.errors += 1
+                raise EldomApiUnavailableError(f"Requests to {host} are paused")
+            # An open breaker only lets the probe request through.
+            probe = breaker.is_open
+            sent_at = None
+
+            # The breaker hears of each answer once, from the request that
+            # was sent, not from every request sharing its result.
+            async def _async_send():
+                nonlocal sent_at
+                metrics.calls += 1
+                sent_at = time.monotonic()
+                try:
+                    result = await self._async_request(method, url, data, headers)
+                except EldomApiRateLimitedError:
+                    raise
+                except EldomApiCommunicationError:
+                    if not speculative:
+                        breaker.record_failure()
+                    raise
+                except (EldomApiAuthError, EldomApiResponseError):
+                    breaker.record_success()
+                    raise
+                breaker.record_success()
+                return result
 
-                elif method == "post":
-                    response = await self._session.post(
-                        url, headers=headers, json=data, ssl=False
+            try:
+                result = await queue.async_run(priority, _async_send, key)
+            except asyncio.CancelledError:
+                if probe:
+                    breaker.cancel_probe()
+                raise
+            except EldomApiRateLimitedError as exception:
+                # The host is up, only asking to slow down.
+                if probe:
+                    breaker.cancel_probe()
+                limiter.throttled(exception.retry_after)
+                metrics.errors += 1
+                if speculative or attempt >= MAX_RETRIES:
+                    raise
+                attempt += 1
+                metrics.retries += 1
+                continue
+            except EldomApiCommunicationError as exception:
+                metrics.errors += 1
+                if isinstance(exception, EldomApiTimeoutError):
+                    metrics.timeouts += 1
+                if speculative:
+                    if probe:
+                        breaker.cancel_probe()
+                    raise
+                if attempt >= MAX_RETRIES or breaker.is_open:
+                    _ERROR_LOG.error(
+                        (host, type(exception)),
+                        "Error fetching information from %s - %s",
+                        url,
+                        exception,
                     )
-                    return await response.json()
+                    raise
+                delay = random.uniform(0, RETRY_BACKOFF * 2**attempt)
+                attempt += 1
+                metrics.retries += 1
+                _LOGGER.debug("Retrying %s in %.2fs - %s", url, delay, exception)
+                await asyncio.sleep(delay)
+                continue
+            except EldomApiAuthError:
+                metrics.errors += 1
+                if not reauthenticate or self._credentials is None:
+                    raise
+                reauthenticate = False
+                expired_token = headers.get("Authorization", "")[len("Bearer ") :]
+                token = await self._credentials.async_refresh(expired_token)
+                headers = {**headers, "Authorization": f"Bearer {token}"}
+                continue
+            except EldomApiResponseError:
+                metrics.errors += 1
+                raise
+            limiter.answered()
+            if sent_at is not None:
+                metrics.record_latency(time.monotonic() - sent_at)
+            return result
 
+    async def _async_request(self, method: str, url: str, data, headers) -> dict:
+        """Send one request, and decode the response once through the codec."""
+        try:
+            async with async_timeout.timeout(TIMEOUT):
+                async with self._session.request(
+                    method.upper(), url, headers=headers, data=data
+                ) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    raw = await response.read()
         except asyncio.TimeoutError as exception:
-            _LOGGER.error(
-                "Timeout error fetching information from %s - %s",
-                url,
-                exception,
-            )
-
-        except (KeyError, TypeError) as exception:
-            _LOGGER.error(
-                "Error parsing information from %s - %s",
-                url,
-                exception,
-            )
+            raise EldomApiTimeoutError(f"Timeout fetching {url}") from exception
         except (aiohttp.ClientError, socket.gaierror) as exception:
-            _LOGGER.error(
-                "Error fetching information from %s - %s",
-                url,
-                exception,
+            raise EldomApiCommunicationError(str(exception)) from exception
+
+        if status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+            raise EldomApiAuthError(f"{url} answered {status}")
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            raise EldomApiRateLimitedError(
+                f"{url} answered {status}", _retry_after(retry_after)
             )
-        except Exception as exception:  # pylint: disable=broad-except
-            _LOGGER.error("Something really wrong happened! - %s", exception)
+        if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise EldomApiCommunicationError(f"{url} answered {status}")
+        if status >= HTTPStatus.BAD_REQUEST:
+            raise EldomApiResponseError(f"{url} answered {status}")
+        if method in ("put", "patch"):
+            return None
+
+        try:
+            result = self._codec.loads(raw)
+        except ValueError as exception:
+            raise EldomApiResponseError(f"Invalid JSON from {url}") from exception
+        _LOGGER.debug("Response from %s: %s", url, result)
+        return result
@@ -0,0 +1,92 @@
+"""Circuit breaker shared by every client talking to one host."""
+import logging
+import time
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+_BREAKERS = {}
+
+
+def get_breaker(host: str) -> "CircuitBreaker":
+    """Return the breaker of a host."""
+    breaker = _BREAKERS.get(host)
+    if breaker is None:
+        breaker = _BREAKERS[host] = CircuitBreaker(host)
+    return breaker
+
+
+class CircuitBreaker:
+    """Stop sending requests to a host while it keeps failing.
+
+    The breaker opens after FAILURE_THRESHOLD consecutive transient failures.
+    While open, requests are refused. After RESET_TIMEOUT a single probe
+    request is let through: its success closes the breaker, its failure
+    opens it again.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ) -> None:
+        """Initialize."""
+        self._host = host
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if requests are currently refused."""
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self._opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self._opened_at < self._reset_timeout:
+            return False
+        self._probing = True
+        return True
+
+    def cancel_probe(self) -> None:
+        """Let another request probe the host, the probe did not get an answer.
+
+        Only the request allow_request() let through as the probe may call this.
+        """
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Close the breaker, the host answered."""
+        if self._opened_at is not None:
+            _LOGGER.info("%s is reachable again", self._host)
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a transient failure, opening the breaker past the threshold."""
+        self._failures += 1
+        if self._probing or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                _LOGGER.warning(
+                    "%s keeps failing, pausing requests for %s seconds",
+                    self._host,
+                    self._reset_timeout,
+                )
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def as_dict(self) -> dict:
+        """Return the state of the breaker."""
+        return {
+            "open": self.is_open,
+            "failures": self._failures,
+            "probing": self._probing,
+        }
@@ -14,8 +14,6 @@ from homeassistant.const import ATTR_TEMPERATURE
 from homeassistant.const import PRECISION_WHOLE
 from homeassistant.const import TEMP_CELSIUS
 
-from .const import CLIMATE
-from .const import DEFAULT_NAME
 from .const import DOMAIN
 from .entity import EldomEntity
 
@@ -24,8 +22,10 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_devices([EldomClimate(coordinator, entry)])
+    hub = hass.data[DOMAIN][entry.entry_id]
+    async_add_devices(
+        [EldomClimate(coordinator, entry) for coordinator in hub.coordinators.values()]
+    )
 
 
 class EldomClimate(EldomEntity, ClimateEntity):
@@ -38,16 +38,17 @@ class EldomClimate(EldomEntity, ClimateEntity):
     _attr_target_temperature_step = PRECISION_WHOLE
     _attr_temperature_unit = TEMP_CELSIUS
 
+    watched_fields = frozenset({"temperature", "setpoint", "operation"})
+
     @property
     def name(self) -> str:
         """Return the name of the device, if any."""
-        return f"{DEFAULT_NAME}_{CLIMATE}"
+        return self.device_name
 
     @property
     def hvac_mode(self) -> str:
         """Return hvac operation ie. heat, cool mode."""
-        operation = self.coordinator.data["Operation"]
-        if operation == "16":
+        if self.coordinator.data.is_heating:
             return HVAC_MODE_HEAT
         return HVAC_MODE_OFF
 
@@ -61,41 +62,26 @@ class EldomClimate(EldomEntity, ClimateEntity):
     async def async_set_hvac_mode(self, hvac_mode: str) -> None:
         """Set hvac mode."""
         if hvac_mode == HVAC_MODE_HEAT:
-            setpoint = self.coordinator.data["TSet"]
-            setpoint = f"{setpoint[0:2]}.{setpoint[2:3]}"
-            temperature = max(self.min_temp, int(float(setpoint)), self.min_temp)
-            await self.coordinator.api.async_turn_on_or_off("On")
-            data = self.coordinator.data
-            data["TSet"] = int(temperature)
-            data["Req"] = "SetParams"
-            await self.coordinator.api.async_set_parameter(data)
+            setpoint = None
+            if self.target_temperature < self.min_temp:
+                setpoint = self.min_temp
+            await self.coordinator.commands.async_set(on=True, setpoint=setpoint)
         elif hvac_mode == HVAC_MODE_OFF:
-            await self.coordinator.api.async_turn_on_or_off("Off")
-        else:
-            return
-        await self.coordinator.async_request_refresh()
+            await self.coordinator.commands.async_set(on=False)
 
     @property
     def current_temperature(self) -> float | None:
         """Return the current temperature."""
-        temperature = self.coordinator.data["T"]
-        temperature = f"{temperature[0:2]}.{temperature[2:3]}"
-        return int(float(temperature))
+        return self.coordinator.data.temperature / 10
 
     @property
-    def target_temperature(self) -> int | None:
+    def target_temperature(self) -> float | None:
         """Return the temperature we try to reach."""
-        setpoint = self.coordinator.data["TSet"]
-        setpoint = f"{setpoint[0:2]}.{setpoint[2:3]}"
-        return int(float(setpoint))
+        return self.coordinator.data.setpoint / 10
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set new target temperature."""
         temperature = kwargs.get(ATTR_TEMPERATURE)
         if temperature is None:
             return
-        data = self.coordinator.data
-        data["TSet"] = int(temperature)
-        data["Req"] = "SetParams"
-        await self.coordinator.api.async_set_parameter(data)
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.commands.async_set(setpoint=temperature)
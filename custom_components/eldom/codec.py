@@ -0,0 +1,42 @@
+"""JSON codec used by the eldom API client."""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JsonCodec:
+    """Encode request bodies to bytes and decode response bodies."""
+
+    name = "json"
+
+    @staticmethod
+    def dumps(value) -> bytes:
+        """Encode a value."""
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(raw: bytes):
+        """Decode a value."""
+        return json.loads(raw)
+
+
+class OrjsonCodec(JsonCodec):
+    """JsonCodec backed by orjson."""
+
+    name = "orjson"
+
+    @staticmethod
+    def dumps(value) -> bytes:
+        """Encode a value."""
+        return orjson.dumps(value)
+
+    @staticmethod
+    def loads(raw: bytes):
+        """Decode a value."""
+        return orjson.loads(raw)
+
+
+DEFAULT_CODEC = OrjsonCodec if orjson is not None else JsonCodec
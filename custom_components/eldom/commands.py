@@ -0,0 +1,169 @@
+"""Command queue for eldom heaters."""
+import asyncio
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .api import EldomApiClientError
+from .schedule import WeeklyProgram
+from .snapshot import EldomSnapshot
+from .snapshot import format_tenths
+from .snapshot import Operation
+
+COMMAND_DEBOUNCE = 0.5
+
+
+def _reconcile(data: EldomSnapshot, expected: dict, responses: list) -> tuple:
+    """Apply written changes to a snapshot, and check the write responses.
+
+    Returns the new snapshot and whether the responses confirmed every
+    change. Fields reported by the device win over the optimistic values.
+    """
+    reported = {}
+    confirmed = True
+    for response in responses:
+        if isinstance(response, dict):
+            reported.update(response)
+        else:
+            confirmed = False
+    snapshot = data.merge({**expected, **reported})
+
+    for key, value in expected.items():
+        if key not in reported:
+            confirmed = False
+        elif key == "Operation":
+            expected_operation = Operation.from_raw(value)
+            if Operation.from_raw(reported[key]) is not expected_operation:
+                confirmed = False
+        elif str(reported[key]).upper() != value.upper():
+            confirmed = False
+    return snapshot, confirmed
+
+
+class EldomCommandQueue:
+    """Pending changes of one heater, written as one batch.
+
+    Changes made within COMMAND_DEBOUNCE of each other are merged, the last
+    one winning, and turned into the fewest direct-req calls. The changes
+    are applied to the coordinator data right away; a refresh follows the
+    batch only when the write responses do not confirm them.
+
+    Writes run one at a time, each built from the snapshot left by the
+    previous one. version counts the completed writes, so that a poll
+    overlapping a write can be recognized and dropped.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._pending = {}
+        self._waiters = []
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self.version = 0
+
+    @property
+    def writing(self) -> bool:
+        """Return True while a write is in flight."""
+        return self._lock.locked()
+
+    async def async_set(self, on: bool = None, setpoint: int = None) -> None:
+        """Queue a mode and/or setpoint change, and wait until it is sent."""
+        if on is not None:
+            self._pending["on"] = on
+        if setpoint is not None:
+            self._pending["setpoint"] = int(setpoint)
+
+        waiter = self._hass.loop.create_future()
+        self._waiters.append(waiter)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._hass.loop.call_later(COMMAND_DEBOUNCE, self._flush)
+        await waiter
+
+    @callback
+    def _flush(self) -> None:
+        """Send the pending changes."""
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, []
+        self._hass.async_create_task(self._async_send(pending, waiters))
+
+    async def async_apply(
+        self, on: bool = None, setpoint: int = None, program: WeeklyProgram = None
+    ) -> bool:
+        """Write a mode, setpoint and/or program change right away.
+
+        No refresh follows. Returns True if the write responses confirmed
+        the change.
+        """
+        pending = {}
+        if on is not None:
+            pending["on"] = on
+        if setpoint is not None:
+            pending["setpoint"] = int(setpoint)
+        if program is not None:
+            pending["program"] = program
+        return await self._async_apply(pending)
+
+    async def _async_apply(self, pending: dict) -> bool:
+        async with self._lock:
+            try:
+                expected, responses = await self._async_write(pending)
+            finally:
+                self.version += 1
+            data, confirmed = _reconcile(self._coordinator.data, expected, responses)
+            self._coordinator.command_sent()
+            self._coordinator.async_set_updated_data(data)
+        return confirmed
+
+    async def _async_send(self, pending: dict, waiters: list) -> None:
+        """Write a batch of changes and refresh once."""
+        try:
+            if not await self._async_apply(pending):
+                await self._coordinator.async_request_refresh()
+        except Exception as exception:  # pylint: disable=broad-except
+            error = exception
+            if isinstance(exception, EldomApiClientError):
+                error = HomeAssistantError(
+                    f"Could not send command to {self._coordinator.name}: {exception}"
+                )
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(error)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _async_write(self, pending: dict) -> tuple:
+        """Turn merged changes into direct-req calls.
+
+        Returns the fields the calls should have changed, and the responses.
+        """
+        api = self._coordinator.api
+        data = self._coordinator.data
+        expected = {}
+        responses = []
+
+        if "on" in pending:
+            on = pending["on"]
+            expected["Operation"] = (Operation.HEAT if on else Operation.OFF).value
+            responses.append(await api.async_turn_on_or_off("On" if on else "Off"))
+
+        # Setpoint and program changes share one SetParams call.
+        parameters = data.parameters()
+        setpoint = pending.get("setpoint")
+        if setpoint is not None and setpoint * 10 != data.setpoint:
+            parameters["TSet"] = setpoint
+            expected["TSet"] = format_tenths(setpoint * 10)
+        program = pending.get("program")
+        if program is not None and program != data.program:
+            parameters["AutoTimeSet"] = expected["AutoTimeSet"] = program.to_raw()
+        if "TSet" in expected or "AutoTimeSet" in expected:
+            parameters["Req"] = "SetParams"
+            responses.append(await api.async_set_parameter(parameters))
+
+        return expected, responses
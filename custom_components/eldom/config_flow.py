@@ -1,18 +1,30 @@
 """Adds config flow for eldom."""
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_DEVICE_ID
-from homeassistant.const import CONF_FRIENDLY_NAME
 from homeassistant.const import CONF_PASSWORD
 from homeassistant.const import CONF_USERNAME
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
 from .api import EldomApiClient
-from .const import CONF_ACCESS_TOKEN
-from .const import CONF_UNIQUE_ID
+from .const import CONF_DEVICES
+from .const import CONF_GRACE_PERIOD
+from .const import CONF_HEATER_POWER
+from .const import CONF_MAX_INTERVAL
+from .const import CONF_MIN_INTERVAL
+from .const import CONF_POLL_RATE
+from .const import CONF_WRITE_RATE
+from .const import DEFAULT_GRACE_PERIOD
+from .const import DEFAULT_HEATER_POWER
+from .const import DEFAULT_MAX_INTERVAL
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_POLL_RATE
+from .const import DEFAULT_WRITE_RATE
 from .const import DOMAIN
 from .const import PLATFORMS
+from .credentials import async_get_credentials
+from .credentials import EldomCredentials
+from .device_index import async_get_device_index
+from .session import async_get_session
 
 
 class EldomHeaterHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -34,20 +46,20 @@ class EldomHeaterHandler(config_entries.ConfigFlow, domain=DOMAIN):
         #     return self.async_abort(reason="single_instance_allowed")
 
         if user_input is not None:
-            response = await self._get_credentials(
+            credentials = await self._get_credentials(
                 user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
             )
-            token = response["id_token"]
-            if token:
-
-                response = await self._get_devices(token)
-                user_input[CONF_ACCESS_TOKEN] = token
-                user_input[CONF_UNIQUE_ID] = response[0]["uuid"]
-                user_input[CONF_DEVICE_ID] = response[0]["pairTok"]
-                user_input[CONF_FRIENDLY_NAME] = response[0]["name"]
-                return self.async_create_entry(
-                    title=user_input[CONF_USERNAME], data=user_input
-                )
+            if credentials:
+                await self.async_set_unique_id(user_input[CONF_USERNAME])
+                self._abort_if_unique_id_configured()
+
+                response = await self._get_devices(credentials)
+                if response:
+                    user_input[CONF_DEVICES] = response
+                    return self.async_create_entry(
+                        title=user_input[CONF_USERNAME], data=user_input
+                    )
+                self._errors["base"] = "no_devices"
             else:
                 self._errors["base"] = "auth"
 
@@ -71,22 +83,23 @@ class EldomHeaterHandler(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
     async def _get_credentials(self, username, password):
-        """Return response if credentials is valid."""
+        """Return the account credentials if they are valid."""
         try:
-            session = async_create_clientsession(self.hass)
-            client = EldomApiClient(session, username=username, password=password)
-            response = await client.async_get_token()
-            return response
+            session = await async_get_session(self.hass)
+            credentials = EldomCredentials(session, username, password)
+            token = await credentials.async_refresh()
+            return async_get_credentials(self.hass, session, username, password, token)
         except Exception:  # pylint: disable=broad-except
             pass
         return False
 
-    async def _get_devices(self, token):
+    async def _get_devices(self, credentials):
         """Return devices"""
         try:
-            session = async_create_clientsession(self.hass)
-            client = EldomApiClient(session, token=token)
-            response = await client.async_get_devices()
+            session = await async_get_session(self.hass)
+            client = EldomApiClient(session, credentials=credentials)
+            index = await async_get_device_index(self.hass)
+            response = await index.async_get_devices(credentials.username, client)
             return response
         except Exception:  # pylint: disable=broad-except
             pass
@@ -107,18 +120,57 @@ class EldomOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
+        errors = {}
         if user_input is not None:
-            self.options.update(user_input)
-            return await self._update_options()
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "interval"
+            else:
+                self.options.update(user_input)
+                return await self._update_options()
+
+        schema = {
+            vol.Required(x, default=self.options.get(x, True)): bool
+            for x in sorted(PLATFORMS)
+        }
+        schema[
+            vol.Required(
+                CONF_MIN_INTERVAL,
+                default=self.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=5))
+        schema[
+            vol.Required(
+                CONF_MAX_INTERVAL,
+                default=self.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=5))
+        schema[
+            vol.Required(
+                CONF_GRACE_PERIOD,
+                default=self.options.get(CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        schema[
+            vol.Required(
+                CONF_HEATER_POWER,
+                default=self.options.get(CONF_HEATER_POWER, DEFAULT_HEATER_POWER),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        schema[
+            vol.Required(
+                CONF_POLL_RATE,
+                default=self.options.get(CONF_POLL_RATE, DEFAULT_POLL_RATE),
+            )
+        ] = vol.All(vol.Coerce(float), vol.Range(min=0.1))
+        schema[
+            vol.Required(
+                CONF_WRITE_RATE,
+                default=self.options.get(CONF_WRITE_RATE, DEFAULT_WRITE_RATE),
+            )
+        ] = vol.All(vol.Coerce(float), vol.Range(min=0.1))
 
         return self.async_show_form(
-            step_id="user",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(x, default=self.options.get(x, True)): bool
-                    for x in sorted(PLATFORMS)
-                }
-            ),
+            step_id="user", data_schema=vol.Schema(schema), errors=errors
         )
 
     async def _update_options(self):
@@ -9,6 +9,8 @@ ISSUE_URL = "https://github.com/pve84/eldom/issues"
 # Icons
 ICON = "mdi:radiator"
 ICON_SETPOINT = "hass:thermometer"
+ICON_METRIC = "mdi:chart-bell-curve"
+ICON_TREND = "mdi:chart-line"
 
 # Platforms
 CLIMATE = "climate"
@@ -20,9 +22,24 @@ CONF_ACCESS_TOKEN = "token"
 CONF_UNIQUE_ID = "uuid"
 CONF_FRIENDLY_NAME = "name"
 CONF_DEVICE_ID = "device_id"
+CONF_DEVICES = "devices"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_GRACE_PERIOD = "grace_period"
+CONF_HEATER_POWER = "heater_power"
+CONF_POLL_RATE = "poll_rate"
+CONF_WRITE_RATE = "write_rate"
 
 # Defaults
 DEFAULT_NAME = DOMAIN
+DEFAULT_MAX_CONCURRENT_POLLS = 4
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MIN_INTERVAL = 15
+DEFAULT_MAX_INTERVAL = 300
+DEFAULT_GRACE_PERIOD = 900
+DEFAULT_HEATER_POWER = 2000
+DEFAULT_POLL_RATE = 5.0
+DEFAULT_WRITE_RATE = 2.0
 
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
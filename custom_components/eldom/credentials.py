@@ -0,0 +1,138 @@
+"""Token lifecycle of Eldom accounts."""
+import asyncio
+import base64
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+
+from .api import BASE_URL
+from .api import EldomApiAuthError
+from .api import EldomApiClient
+from .api import EldomApiResponseError
+from .const import DOMAIN
+
+TOKEN_REFRESH_MARGIN = 300
+
+DATA_CREDENTIALS = "credentials"
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@callback
+def async_get_credentials(
+    hass: HomeAssistant,
+    session: aiohttp.ClientSession,
+    username: str,
+    password: str,
+    token: str = None,
+    base_url: str = BASE_URL,
+) -> "EldomCredentials":
+    """Return the credentials of an account, shared by all its entries.
+
+    A changed password, for instance after a re-authentication, replaces
+    the one of the shared credentials.
+    """
+    registry = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_CREDENTIALS, {})
+    key = (username, urlsplit(base_url).hostname)
+    credentials = registry.get(key)
+    if credentials is None:
+        credentials = EldomCredentials(
+            session, username, password, token, base_url=base_url
+        )
+        registry[key] = credentials
+    else:
+        credentials.update_password(password, token)
+    return credentials
+
+
+def _token_expiry(token: str) -> float:
+    """Return the expiry timestamp of a JWT, infinity if it has none."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return float("inf")
+
+
+class EldomCredentials:
+    """Token of one Eldom account, shared by every client of that account.
+
+    The token is renewed shortly before its expiry, and concurrent refreshes
+    (for instance many clients hitting a 401 at once) share one request.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        username: str,
+        password: str,
+        token: str = None,
+        base_url: str = BASE_URL,
+    ) -> None:
+        self._base_url = base_url
+        self._session = session
+        self._username = username
+        self._password = password
+        self._token = token
+        self._expires_at = _token_expiry(token) if token else 0.0
+        self._refresh = None
+
+    @property
+    def username(self) -> str:
+        """Return the account the token belongs to."""
+        return self._username
+
+    def update_password(self, password: str, token: str = None) -> None:
+        """Authenticate with a new password, and the token it got if any."""
+        if password == self._password:
+            return
+        self._password = password
+        self._token = token
+        self._expires_at = _token_expiry(token) if token else 0.0
+
+    async def async_get_access_token(self) -> str:
+        """Return a valid token, refreshing it when it is about to expire."""
+        if time.time() >= self._expires_at - TOKEN_REFRESH_MARGIN:
+            return await self.async_refresh()
+        return self._token
+
+    async def async_refresh(self, expired_token: str = None) -> str:
+        """Authenticate again, unless expired_token was already replaced."""
+        if expired_token is not None and expired_token != self._token:
+            return self._token
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._async_authenticate())
+        refresh = self._refresh
+        try:
+            return await asyncio.shield(refresh)
+        finally:
+            if refresh.done() and self._refresh is refresh:
+                self._refresh = None
+
+    async def _async_authenticate(self) -> str:
+        """Get a new token from the API."""
+        client = EldomApiClient(
+            self._session,
+            username=self._username,
+            password=self._password,
+            base_url=self._base_url,
+        )
+        try:
+            response = await client.async_get_token()
+        except EldomApiResponseError as exception:
+            raise EldomApiAuthError(
+                f"Authentication failed for {self._username}"
+            ) from exception
+        token = response.get("id_token") if isinstance(response, dict) else None
+        if not token:
+            raise EldomApiAuthError(f"Authentication failed for {self._username}")
+        self._token = token
+        self._expires_at = _token_expiry(token)
+        _LOGGER.debug("Refreshed the token of %s", self._username)
+        return token
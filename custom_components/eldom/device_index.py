@@ -0,0 +1,94 @@
+"""Cached index of the heaters of each Eldom account."""
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import EldomApiClient
+from .api import EldomApiClientError
+from .const import CONF_DEVICE_ID
+from .const import CONF_FRIENDLY_NAME
+from .const import CONF_UNIQUE_ID
+from .const import DOMAIN
+
+STORAGE_KEY = f"{DOMAIN}.device_index"
+STORAGE_VERSION = 1
+DEVICE_INDEX_TTL = timedelta(hours=24)
+
+DATA_DEVICE_INDEX = "device_index"
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+async def async_get_device_index(hass: HomeAssistant) -> "EldomDeviceIndex":
+    """Return the device index, loading it from storage on first use."""
+    index = hass.data.setdefault(DOMAIN, {}).get(DATA_DEVICE_INDEX)
+    if index is None:
+        index = EldomDeviceIndex(hass)
+        await index.async_load()
+        hass.data[DOMAIN][DATA_DEVICE_INDEX] = index
+    return index
+
+
+class EldomDeviceIndex:
+    """Map of uuid to pairTok and name for every account, with a TTL."""
+
+    def __init__(self, hass: HomeAssistant, ttl: timedelta = DEVICE_INDEX_TTL):
+        """Initialize."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._ttl = ttl.total_seconds()
+        self._accounts = {}
+
+    async def async_load(self) -> None:
+        """Load the index from storage."""
+        data = await self._store.async_load()
+        if data is not None:
+            self._accounts = data
+
+    def devices(self, account: str) -> list:
+        """Return the cached devices of an account, fresh or not."""
+        entry = self._accounts.get(account)
+        if entry is None:
+            return None
+        return [
+            {
+                CONF_UNIQUE_ID: uuid,
+                CONF_DEVICE_ID: device["pairTok"],
+                CONF_FRIENDLY_NAME: device["name"],
+            }
+            for uuid, device in entry["devices"].items()
+        ]
+
+    def is_fresh(self, account: str) -> bool:
+        """Return True if the account was discovered within the TTL."""
+        entry = self._accounts.get(account)
+        return entry is not None and time.time() - entry["updated"] < self._ttl
+
+    async def async_get_devices(
+        self, account: str, client: EldomApiClient, force: bool = False
+    ) -> list:
+        """Return the devices of an account, discovering them when stale."""
+        if force or not self.is_fresh(account):
+            devices = {}
+            try:
+                async for device in client.async_iter_devices():
+                    devices[device["uuid"]] = {
+                        "pairTok": device["pairTok"],
+                        "name": device["name"],
+                    }
+            except EldomApiClientError as exception:
+                _LOGGER.warning("Discovery failed for %s - %s", account, exception)
+                return self.devices(account)
+            if devices:
+                self._accounts[account] = {"updated": time.time(), "devices": devices}
+                await self._store.async_save(self._accounts)
+            else:
+                _LOGGER.warning("No devices discovered for %s", account)
+        return self.devices(account)
+
+    async def async_remove(self, account: str) -> None:
+        """Forget an account."""
+        if self._accounts.pop(account, None) is not None:
+            await self._store.async_save(self._accounts)
@@ -0,0 +1,44 @@
+"""Diagnostics support for eldom."""
+from urllib.parse import urlsplit
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.const import CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .api import BASE_URL
+from .breaker import get_breaker
+from .const import CONF_ACCESS_TOKEN
+from .const import DOMAIN
+from .limiter import get_limiter
+from .stagger import async_get_stagger
+
+TO_REDACT = {CONF_PASSWORD, CONF_ACCESS_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for a config entry."""
+    hub = hass.data[DOMAIN][entry.entry_id]
+    host = urlsplit(BASE_URL).hostname
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "devices": {
+            uuid: {
+                "last_update_success": coordinator.last_update_success,
+                "available": coordinator.available,
+                "stale": coordinator.stale,
+                "last_updated": coordinator.last_updated
+                and coordinator.last_updated.isoformat(),
+                "update_interval": coordinator.update_interval.total_seconds(),
+                "data": coordinator.data.as_dict() if coordinator.data else None,
+                "metrics": coordinator.api.metrics.as_dict(),
+            }
+            for uuid, coordinator in hub.coordinators.items()
+        },
+        "breaker": get_breaker(host).as_dict(),
+        "limiter": get_limiter(entry.data[CONF_USERNAME], host).as_dict(),
+        "polling": async_get_stagger(hass).as_dict(),
+    }
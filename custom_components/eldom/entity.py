@@ -1,30 +1,84 @@
 """EldomHeaterEntity class"""
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
+from .const import CONF_FRIENDLY_NAME
 from .const import DOMAIN
 from .const import NAME
 from .const import VERSION
 
 
 class EldomEntity(CoordinatorEntity):
+    # Snapshot fields the state and attributes of the entity depend on, None
+    # to write the state after every update.
+    watched_fields = frozenset()
+
     def __init__(self, coordinator, config_entry):
         super().__init__(coordinator)
         self.config_entry = config_entry
+        self._was_available = None
+        if self.watched_fields is not None:
+            self._watched = self.watched_fields | {"stale"}
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the availability of the state written when added."""
+        await super().async_added_to_hass()
+        self._was_available = self.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if availability or a watched field changed."""
+        available = self.available
+        if (
+            self.watched_fields is not None
+            and available == self._was_available
+            and not self._changed()
+        ):
+            return
+        self._was_available = available
+        super()._handle_coordinator_update()
+
+    def _changed(self) -> bool:
+        """Return True if the last update changed what the entity shows."""
+        return bool(self.coordinator.changed_fields & self._watched)
 
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
-        return self.config_entry.entry_id
+        return self.coordinator.unique_id
+
+    @property
+    def device_name(self):
+        """Return the name of the heater as known by the Eldom cloud."""
+        return self.coordinator.device[CONF_FRIENDLY_NAME]
 
     @property
     def device_info(self):
         return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": NAME,
+            "identifiers": {(DOMAIN, self.coordinator.unique_id)},
+            "name": self.device_name,
             "model": VERSION,
             "manufacturer": NAME,
         }
 
+    @property
+    def available(self):
+        """Return True while the coordinator serves fresh or recent data."""
+        return self.coordinator.available
+
+    @property
+    def extra_state_attributes(self):
+        """Return whether the state is stale, and when it was polled."""
+        last_updated = self.coordinator.last_updated
+        if last_updated is None:
+            return {"stale": self.coordinator.stale}
+        return {
+            "stale": self.coordinator.stale,
+            "last_updated": last_updated.isoformat(),
+            "age": int((dt_util.utcnow() - last_updated).total_seconds()),
+        }
+
     @property
     def device_state_attributes(self):
         """Return the state attributes."""
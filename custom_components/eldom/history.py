@@ -0,0 +1,130 @@
+"""Bounded in-memory history of the readings of an eldom heater."""
+import math
+import time
+from array import array
+
+from .snapshot import EldomSnapshot
+
+HISTORY_SPAN = 24 * 3600
+# Windows of the duty cycle, in seconds.
+DUTY_CYCLE_WINDOWS = (3600, HISTORY_SPAN)
+# Window of the temperature rate, in seconds.
+RATE_WINDOW = 3600
+
+
+class _Window:
+    """Running sums over the samples of the last `span` seconds."""
+
+    __slots__ = ("span", "tail", "seconds", "heating_seconds")
+
+    def __init__(self, span: float) -> None:
+        self.span = span
+        self.tail = None
+        self.seconds = 0.0
+        self.heating_seconds = 0.0
+
+
+class EldomHistory:
+    """Ring buffer of (time, T, TSet, heating) samples of one heater.
+
+    Samples live in preallocated arrays sized for HISTORY_SPAN at the
+    shortest poll interval, so memory stays bounded. Every window keeps the
+    index of its oldest sample and running sums, so appending a sample and
+    reading a derived value are O(1), amortized over the samples leaving
+    the windows.
+    """
+
+    def __init__(self, min_interval: float) -> None:
+        """Initialize."""
+        self._capacity = math.ceil(HISTORY_SPAN / max(min_interval, 1)) + 1
+        self._times = array("d", bytes(8 * self._capacity))
+        self._temperatures = array("h", bytes(2 * self._capacity))
+        self._setpoints = array("h", bytes(2 * self._capacity))
+        self._heating = array("b", bytes(self._capacity))
+        self._head = 0
+        self._size = 0
+        self._windows = {span: _Window(span) for span in DUTY_CYCLE_WINDOWS}
+        self._windows.setdefault(RATE_WINDOW, _Window(RATE_WINDOW))
+        self.heating_seconds = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self, offset: int) -> int:
+        """Return the array index of the offset-th newest sample."""
+        return (self._head - 1 - offset) % self._capacity
+
+    def _interval(self, index: int) -> tuple:
+        """Return the duration of a sample, and how long it was heating."""
+        following = (index + 1) % self._capacity
+        seconds = self._times[following] - self._times[index]
+        return seconds, seconds if self._heating[index] else 0.0
+
+    def _evict(self, window: _Window) -> None:
+        """Move the oldest sample of a window out of it."""
+        seconds, heating_seconds = self._interval(window.tail)
+        window.seconds -= seconds
+        window.heating_seconds -= heating_seconds
+        window.tail = (window.tail + 1) % self._capacity
+
+    def append(self, data: EldomSnapshot, now: float = None) -> None:
+        """Add the readings of a snapshot."""
+        if now is None:
+            now = time.monotonic()
+        if self._size == self._capacity:
+            # The oldest sample is overwritten, drop it from every window.
+            for window in self._windows.values():
+                if window.tail == self._head:
+                    self._evict(window)
+        else:
+            self._size += 1
+
+        index = self._head
+        self._times[index] = now
+        self._temperatures[index] = data.temperature
+        self._setpoints[index] = data.setpoint
+        self._heating[index] = data.is_heating
+        self._head = (index + 1) % self._capacity
+
+        if self._size > 1:
+            seconds, heating_seconds = self._interval(self._index(1))
+            self.heating_seconds += heating_seconds
+        for window in self._windows.values():
+            if window.tail is None:
+                window.tail = index
+                continue
+            if self._size > 1:
+                window.seconds += seconds
+                window.heating_seconds += heating_seconds
+            while window.tail != index and self._times[window.tail] < now - window.span:
+                self._evict(window)
+
+    def duty_cycle(self, span: int):
+        """Return the share of the last span seconds spent heating, in percent."""
+        window = self._windows[span]
+        if not window.seconds:
+            return None
+        return 100 * window.heating_seconds / window.seconds
+
+    def temperature_rate(self):
+        """Return the temperature change over RATE_WINDOW, in °C per hour."""
+        window = self._windows[RATE_WINDOW]
+        if window.tail is None:
+            return None
+        newest = self._index(0)
+        seconds = self._times[newest] - self._times[window.tail]
+        if not seconds:
+            return None
+        change = self._temperatures[newest] - self._temperatures[window.tail]
+        return change / 10 * 3600 / seconds
+
+    def time_to_setpoint(self):
+        """Return the minutes left to reach the setpoint at the current rate."""
+        rate = self.temperature_rate()
+        if not self._size or not rate or rate <= 0:
+            return None
+        newest = self._index(0)
+        if not self._heating[newest]:
+            return None
+        remaining = (self._setpoints[newest] - self._temperatures[newest]) / 10
+        return max(remaining, 0) / rate * 60
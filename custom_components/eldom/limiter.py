@@ -0,0 +1,138 @@
+"""Client-side rate limiter shared by every client of one account and host."""
+import asyncio
+import logging
+import time
+
+from .const import DEFAULT_POLL_RATE
+from .const import DEFAULT_WRITE_RATE
+
+# Pause applied on a 429 without a usable Retry-After, in seconds.
+DEFAULT_RETRY_AFTER = 5
+# On a 429 the rates are halved, down to MIN_FACTOR of the configured ones,
+# and each later answered request gives back RECOVERY_STEP.
+MIN_FACTOR = 0.1
+RECOVERY_STEP = 0.01
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+_LIMITERS = {}
+
+
+def get_limiter(account: str, host: str) -> "RateLimiter":
+    """Return the limiter of an account on a host."""
+    limiter = _LIMITERS.get((account, host))
+    if limiter is None:
+        limiter = _LIMITERS[(account, host)] = RateLimiter(f"{account}@{host}")
+    return limiter
+
+
+class _TokenBucket:
+    """Bucket of `rate` tokens per second, holding at most one second of them."""
+
+    __slots__ = ("rate", "_tokens", "_updated")
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self._tokens = max(rate, 1)
+        self._updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Return how long until a token is available, refilling the bucket."""
+        self._tokens = min(
+            self._tokens + (now - self._updated) * self.rate, max(self.rate, 1)
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+
+class RateLimiter:
+    """Token buckets for the polls and the writes of one account.
+
+    Callers wait for a token instead of failing. A 429 pauses every request
+    for its Retry-After and halves the rates, which then recover
+    additively while requests are answered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        poll_rate: float = DEFAULT_POLL_RATE,
+        write_rate: float = DEFAULT_WRITE_RATE,
+    ) -> None:
+        """Initialize."""
+        self._name = name
+        self._rates = (poll_rate, write_rate)
+        self._factor = 1.0
+        self._polls = _TokenBucket(poll_rate)
+        self._writes = _TokenBucket(write_rate)
+        self._paused_until = 0.0
+
+    def configure(self, poll_rate: float, write_rate: float) -> None:
+        """Change the configured rates."""
+        self._rates = (poll_rate, write_rate)
+        self._apply_factor()
+
+    def _apply_factor(self) -> None:
+        self._polls.rate = self._rates[0] * self._factor
+        self._writes.rate = self._rates[1] * self._factor
+
+    @property
+    def rates(self) -> tuple:
+        """Return the current poll and write rates, in requests per second."""
+        return self._polls.rate, self._writes.rate
+
+    @property
+    def paused_for(self) -> float:
+        """Return how long requests stay paused after a 429, in seconds."""
+        return max(self._paused_until - time.monotonic(), 0)
+
+    async def async_acquire(self, write: bool = False, max_wait: float = None):
+        """Wait for a token, and return how long it took.
+
+        Returns None, without a token, if that would take longer than
+        max_wait seconds.
+        """
+        bucket = self._writes if write else self._polls
+        start = now = time.monotonic()
+        while True:
+            delay = max(self._paused_until - now, bucket.delay(now))
+            if delay <= 0:
+                bucket.take()
+                return now - start
+            if max_wait is not None and now - start + delay > max_wait:
+                return None
+            await asyncio.sleep(delay)
+            now = time.monotonic()
+
+    def throttled(self, retry_after: float = None) -> None:
+        """Slow down after a 429."""
+        if retry_after is None:
+            retry_after = DEFAULT_RETRY_AFTER
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._factor = max(self._factor / 2, MIN_FACTOR)
+        self._apply_factor()
+        _LOGGER.warning(
+            "%s is throttling requests, pausing %ss and slowing down to %.0f%%",
+            self._name,
+            retry_after,
+            self._factor * 100,
+        )
+
+    def answered(self) -> None:
+        """Recover the configured rates step by step."""
+        if self._factor < 1:
+            self._factor = min(self._factor + RECOVERY_STEP, 1.0)
+            self._apply_factor()
+
+    def as_dict(self) -> dict:
+        """Return the state of the limiter."""
+        return {
+            "configured_rates": self._rates,
+            "rates": self.rates,
+            "paused_for": self.paused_for,
+        }
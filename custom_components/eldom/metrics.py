@@ -0,0 +1,111 @@
+"""Lightweight request and poll metrics for eldom heaters."""
+import time
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in seconds. The last bucket
+# collects everything above, up to the API timeout.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class EndpointMetrics:
+    """Counters and latency histogram of one endpoint."""
+
+    __slots__ = (
+        "calls",
+        "errors",
+        "timeouts",
+        "retries",
+        "latency_sum",
+        "latency_max",
+        "last_latency",
+        "histogram",
+    )
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.last_latency = None
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    @property
+    def latency_mean(self):
+        """Return the mean latency of the answered calls, in seconds."""
+        answered = sum(self.histogram)
+        if not answered:
+            return None
+        return self.latency_sum / answered
+
+    def record_latency(self, latency: float) -> None:
+        """Count an answered call."""
+        self.last_latency = latency
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def as_dict(self) -> dict:
+        """Return the metrics as plain values."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "latency_mean": self.latency_mean,
+            "latency_max": self.latency_max,
+            "last_latency": self.last_latency,
+            "histogram": {
+                f"le_{bound}": count
+                for bound, count in zip(LATENCY_BUCKETS + ("inf",), self.histogram)
+            },
+        }
+
+
+class EldomMetrics:
+    """Metrics of the requests and polls of one heater."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.endpoints = {}
+        self.last_poll_duration = None
+        self.last_poll_success = None
+        self._last_success_at = None
+
+    def endpoint(self, name: str) -> EndpointMetrics:
+        """Return the metrics of an endpoint."""
+        metrics = self.endpoints.get(name)
+        if metrics is None:
+            metrics = self.endpoints[name] = EndpointMetrics()
+        return metrics
+
+    def total(self, counter: str) -> int:
+        """Return a counter summed over every endpoint."""
+        return sum(getattr(metrics, counter) for metrics in self.endpoints.values())
+
+    def record_poll(self, duration: float, success: bool) -> None:
+        """Record the outcome of a poll cycle."""
+        self.last_poll_duration = duration
+        self.last_poll_success = success
+        if success:
+            self._last_success_at = time.monotonic()
+
+    @property
+    def staleness(self):
+        """Return the age of the latest successful poll, in seconds."""
+        if self._last_success_at is None:
+            return None
+        return time.monotonic() - self._last_success_at
+
+    def as_dict(self) -> dict:
+        """Return the metrics as plain values."""
+        return {
+            "last_poll_duration": self.last_poll_duration,
+            "last_poll_success": self.last_poll_success,
+            "staleness": self.staleness,
+            "endpoints": {
+                name: metrics.as_dict() for name, metrics in self.endpoints.items()
+            },
+        }
@@ -0,0 +1,139 @@
+"""Headless poller of every heater of an account, streaming NDJSON."""
+import asyncio
+import json
+import time
+from datetime import datetime
+from datetime import timezone
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .api import BASE_URL
+from .api import EldomApiClient
+from .api import EldomApiClientError
+from .const import DEFAULT_MAX_CONCURRENT_POLLS
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_POLL_RATE
+from .const import DEFAULT_WRITE_RATE
+from .credentials import EldomCredentials
+from .limiter import get_limiter
+from .snapshot import EldomSnapshot
+from .stagger import PollStagger
+
+
+def snapshot_record(device: dict, snapshot: EldomSnapshot, latency: float) -> dict:
+    """Return the NDJSON record of a decoded snapshot."""
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "uuid": device["uuid"],
+        "name": device["name"],
+        "latency": round(latency, 4),
+        "temperature": snapshot.temperature / 10,
+        "setpoint": snapshot.setpoint / 10,
+        "operation": snapshot.operation.name.lower(),
+        "lock": snapshot.lock,
+        "antifrost": snapshot.antifrost,
+        "raw": snapshot.as_dict(),
+    }
+
+
+def error_record(device: dict, exception: Exception, latency: float) -> dict:
+    """Return the NDJSON record of a failed poll."""
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "uuid": device["uuid"],
+        "name": device["name"],
+        "latency": round(latency, 4),
+        "error": f"{type(exception).__name__}: {exception}",
+    }
+
+
+class EldomPoller:
+    """Poll many heaters of one account, one NDJSON line per poll.
+
+    Polls are spread evenly over the interval by a PollStagger, which also
+    bounds the polls in flight to `concurrency`. With an interval of 0,
+    every heater is polled back to back, for capacity tests.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        username: str,
+        password: str,
+        output,
+        base_url: str = BASE_URL,
+        interval: float = DEFAULT_MIN_INTERVAL,
+        concurrency: int = DEFAULT_MAX_CONCURRENT_POLLS,
+        poll_rate: float = DEFAULT_POLL_RATE,
+    ) -> None:
+        """Initialize."""
+        self._session = session
+        self._base_url = base_url
+        self._output = output
+        self._interval = interval
+        self._credentials = EldomCredentials(
+            session, username, password, base_url=base_url
+        )
+        self._stagger = PollStagger(concurrency)
+        get_limiter(username, urlsplit(base_url).hostname).configure(
+            poll_rate, DEFAULT_WRITE_RATE
+        )
+        self.polls = 0
+        self.errors = 0
+
+    @property
+    def requests_per_second(self) -> float:
+        """Return the requests per second over the last minute."""
+        return self._stagger.requests_per_second
+
+    async def async_discover(self, uuids: list = None) -> list:
+        """Return the heaters of the account, only those of uuids if given."""
+        client = EldomApiClient(
+            self._session, credentials=self._credentials, base_url=self._base_url
+        )
+        return [
+            {
+                "uuid": device["uuid"],
+                "pairTok": device["pairTok"],
+                "name": device["name"],
+            }
+            async for device in client.async_iter_devices()
+            if not uuids or device["uuid"] in uuids
+        ]
+
+    async def async_run(self, devices: list, count: int = None) -> None:
+        """Poll every heater count times, or until cancelled."""
+        for device in devices:
+            self._stagger.register(device["uuid"])
+        await asyncio.gather(*[self._async_poll_device(d, count) for d in devices])
+
+    async def _async_poll_device(self, device: dict, count: int) -> None:
+        client = EldomApiClient(
+            self._session,
+            credentials=self._credentials,
+            uuid=device["uuid"],
+            deviceId=device["pairTok"],
+            base_url=self._base_url,
+        )
+        delay = self._stagger.delay(device["uuid"], 0, self._interval)
+        polled = 0
+        while count is None or polled < count:
+            await asyncio.sleep(delay)
+            async with self._stagger:
+                calls = client.metrics.total("calls")
+                start = time.monotonic()
+                try:
+                    status, parameters = await client.async_get_status_and_parameters()
+                    snapshot = EldomSnapshot.from_responses(status, parameters)
+                except (EldomApiClientError, KeyError, ValueError) as exception:
+                    self.errors += 1
+                    record = error_record(device, exception, time.monotonic() - start)
+                else:
+                    record = snapshot_record(device, snapshot, time.monotonic() - start)
+                self._stagger.record_poll(client.metrics.total("calls") - calls)
+            self.polls += 1
+            polled += 1
+            self._output.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._output.flush()
+            delay = self._stagger.delay(device["uuid"], self._interval, self._interval)
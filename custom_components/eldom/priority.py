@@ -0,0 +1,125 @@
+"""Priority queue of the requests sent to one account and host."""
+import asyncio
+import heapq
+import itertools
+
+from .const import DEFAULT_MAX_IN_FLIGHT
+
+# Lower runs first.
+PRIORITY_WRITE = 0
+PRIORITY_CONFIRM = 1
+PRIORITY_POLL = 2
+
+_QUEUES = {}
+
+
+class _OwnerCancelled(Exception):
+    """The request a result was shared with was cancelled."""
+
+
+def get_request_queue(account: str, host: str) -> "RequestQueue":
+    """Return the request queue of an account on a host."""
+    queue = _QUEUES.get((account, host))
+    if queue is None:
+        queue = _QUEUES[(account, host)] = RequestQueue()
+    return queue
+
+
+class RequestQueue:
+    """At most max_in_flight requests at once, the most urgent first.
+
+    Writes (and authentication) go first, then the first poll confirming a
+    write, then background polls; requests of one priority run in arrival
+    order. A request queued with the key of a request still waiting shares
+    its result instead of being sent again; if that request is cancelled,
+    one of the requests sharing its result is sent instead.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        """Initialize."""
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._queued = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of requests being sent."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return len(self._waiting)
+
+    async def async_run(self, priority: int, request, key=None):
+        """Await request() once a slot is free, and return its result."""
+        while key is not None and key in self._queued:
+            try:
+                return await asyncio.shield(self._queued[key])
+            except _OwnerCancelled:
+                # The first sharer to wake up queues its own request, the
+                # others share it.
+                continue
+
+        result = None
+        if key is not None:
+            result = self._queued[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self._async_acquire(priority)
+        except BaseException as exception:
+            self._forget(key, result, exception)
+            raise
+        try:
+            # Requests queued from now on are sent again.
+            self._queued.pop(key, None)
+            value = await request()
+        except BaseException as exception:
+            self._forget(key, result, exception)
+            raise
+        finally:
+            self._release()
+        if result is not None:
+            result.set_result(value)
+        return value
+
+    def _forget(self, key, result, exception: BaseException) -> None:
+        """Pass a failure on to the requests sharing the result."""
+        if result is None:
+            return
+        if self._queued.get(key) is result:
+            del self._queued[key]
+        if isinstance(exception, asyncio.CancelledError):
+            exception = _OwnerCancelled()
+        result.set_exception(exception)
+        # Mark the exception as retrieved, nobody may be sharing it.
+        result.exception()
+
+    async def _async_acquire(self, priority: int) -> None:
+        if self._in_flight < self._max_in_flight and not self._waiting:
+            self._in_flight += 1
+            return
+        slot = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), slot))
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                # The slot was handed over just before the cancellation.
+                self._release()
+            else:
+                self._waiting = [
+                    entry for entry in self._waiting if entry[2] is not slot
+                ]
+                heapq.heapify(self._waiting)
+            raise
+
+    def _release(self) -> None:
+        """Hand the slot over to the most urgent waiting request."""
+        while self._waiting:
+            _, _, slot = heapq.heappop(self._waiting)
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self._in_flight -= 1
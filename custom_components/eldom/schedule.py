@@ -0,0 +1,117 @@
+"""Weekly program of an eldom heater, as carried by the AutoTimeSet field.
+
+AutoTimeSet is assumed to be 84 hexadecimal digits: 336 bits, 48 half-hour
+slots for each day from Monday to Sunday, most significant bit first. A set
+bit means the heater follows its setpoint during that slot.
+"""
+import re
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+SLOTS_PER_DAY = 48
+SLOT_MINUTES = 24 * 60 // SLOTS_PER_DAY
+RAW_LENGTH = len(DAYS) * SLOTS_PER_DAY // 4
+
+_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+_PERIOD = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$")
+
+
+def _slot(hours: str, minutes: str) -> int:
+    """Return the slot starting at a time, which must fall on a slot boundary."""
+    minute = int(hours) * 60 + int(minutes)
+    if minute % SLOT_MINUTES or not 0 <= minute <= 24 * 60:
+        raise ValueError(f"{hours}:{minutes} is not on a half hour")
+    return minute // SLOT_MINUTES
+
+
+def _time(slot: int) -> str:
+    minute = slot * SLOT_MINUTES
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class WeeklyProgram:
+    """Immutable weekly program, one 48-bit slot mask per day."""
+
+    __slots__ = ("_days",)
+
+    def __init__(self, days) -> None:
+        """Initialize from seven slot masks, Monday first."""
+        days = tuple(days)
+        if len(days) != len(DAYS):
+            raise ValueError("A weekly program has seven days")
+        self._days = days
+
+    @classmethod
+    def from_raw(cls, raw: str) -> "WeeklyProgram":
+        """Decode an AutoTimeSet value."""
+        if len(raw) != RAW_LENGTH:
+            raise ValueError(f"AutoTimeSet has {len(raw)} digits, not {RAW_LENGTH}")
+        value = int(raw, 16)
+        return cls(
+            (value >> (SLOTS_PER_DAY * (len(DAYS) - 1 - day))) & _DAY_MASK
+            for day in range(len(DAYS))
+        )
+
+    def to_raw(self) -> str:
+        """Encode the AutoTimeSet value."""
+        value = 0
+        for mask in self._days:
+            value = (value << SLOTS_PER_DAY) | mask
+        return f"{value:0{RAW_LENGTH}X}"
+
+    @staticmethod
+    def parse_periods(periods: list) -> int:
+        """Return the slot mask of "HH:MM-HH:MM" periods."""
+        mask = 0
+        for period in periods:
+            match = _PERIOD.match(period.strip())
+            if match is None:
+                raise ValueError(f"{period} is not a HH:MM-HH:MM period")
+            start = _slot(*match.group(1, 2))
+            end = _slot(*match.group(3, 4))
+            if end <= start:
+                raise ValueError(f"{period} ends before it starts")
+            for slot in range(start, end):
+                mask |= 1 << (SLOTS_PER_DAY - 1 - slot)
+        return mask
+
+    def periods(self, day: int) -> list:
+        """Return the periods of a day, as "HH:MM-HH:MM" strings."""
+        mask = self._days[day]
+        periods = []
+        start = None
+        for slot in range(SLOTS_PER_DAY + 1):
+            on = slot < SLOTS_PER_DAY and mask >> (SLOTS_PER_DAY - 1 - slot) & 1
+            if on and start is None:
+                start = slot
+            elif not on and start is not None:
+                periods.append(f"{_time(start)}-{_time(slot)}")
+                start = None
+        return periods
+
+    def replace(self, changes: dict) -> "WeeklyProgram":
+        """Return a program with the periods of some days replaced.
+
+        changes maps day names to lists of periods; other days are kept.
+        """
+        days = list(self._days)
+        for day, periods in changes.items():
+            days[DAYS.index(day)] = self.parse_periods(periods)
+        return WeeklyProgram(days)
+
+    def changed_days(self, other: "WeeklyProgram") -> list:
+        """Return the names of the days that differ from another program."""
+        return [
+            DAYS[day]
+            for day, (mask, other_mask) in enumerate(zip(self._days, other._days))
+            if mask != other_mask
+        ]
+
+    def as_dict(self) -> dict:
+        """Return the periods of every day."""
+        return {name: self.periods(day) for day, name in enumerate(DAYS)}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, WeeklyProgram) and self._days == other._days
+
+    def __hash__(self) -> int:
+        return hash(self._days)
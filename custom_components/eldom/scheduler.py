@@ -0,0 +1,70 @@
+"""Adaptive poll interval for eldom heaters."""
+import random
+from datetime import timedelta
+
+from .snapshot import EldomSnapshot
+
+FAST_POLLS_AFTER_COMMAND = 3
+BACKOFF_FACTOR = 1.5
+JITTER = 0.1
+
+
+class AdaptivePollInterval:
+    """Poll interval following the activity of one heater.
+
+    Polls run at the minimum interval right after a command and while the
+    operation changes, back off towards the maximum while the readings are
+    stable, and stay at the maximum while the heater is off. Failed polls are
+    retried from the minimum, doubling up to the maximum. A random jitter
+    keeps heaters of one account from polling in lockstep.
+    """
+
+    def __init__(self, minimum: timedelta, maximum: timedelta) -> None:
+        """Initialize."""
+        self._minimum = minimum.total_seconds()
+        self._maximum = max(maximum.total_seconds(), self._minimum)
+        self._interval = self._minimum
+        self._fast_polls = 0
+        self._failures = 0
+        self._previous = None
+
+    @property
+    def minimum(self) -> timedelta:
+        """Return the shortest interval."""
+        return timedelta(seconds=self._minimum)
+
+    def command_sent(self) -> None:
+        """Poll fast for the next few cycles to follow a command."""
+        self._fast_polls = FAST_POLLS_AFTER_COMMAND
+        self._interval = self._minimum
+
+    def next_interval(self, data: EldomSnapshot) -> timedelta:
+        """Return the delay until the next poll, given the latest readings."""
+        self._failures = 0
+        readings = (data.operation, data.temperature, data.setpoint)
+        previous, self._previous = self._previous, readings
+
+        if self._fast_polls > 0:
+            self._fast_polls -= 1
+            self._interval = self._minimum
+        elif previous is not None and previous[0] != readings[0]:
+            self._interval = self._minimum
+        elif not data.is_heating:
+            self._interval = self._maximum
+        elif previous is not None and previous != readings:
+            self._interval = self._minimum
+        else:
+            self._interval = min(self._interval * BACKOFF_FACTOR, self._maximum)
+        return self._jittered(self._interval)
+
+    def poll_failed(self) -> timedelta:
+        """Return the delay until the next attempt, after a failed poll."""
+        interval = min(self._minimum * 2**self._failures, self._maximum)
+        self._failures += 1
+        return self._jittered(interval)
+
+    def _jittered(self, interval: float) -> timedelta:
+        jitter = interval * random.uniform(-JITTER, JITTER)
+        return timedelta(
+            seconds=min(max(interval + jitter, self._minimum), self._maximum)
+        )
@@ -1,30 +1,119 @@
 """Sensor platform for eldom_heater."""
-from .const import DEFAULT_NAME
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.helpers.entity import EntityCategory
+
+from .const import CONF_HEATER_POWER
+from .const import DEFAULT_HEATER_POWER
 from .const import DOMAIN
+from .const import ICON_METRIC
 from .const import ICON_SETPOINT
+from .const import ICON_TREND
 from .entity import EldomEntity
+from .history import HISTORY_SPAN
+
+# Diagnostic sensors: key, name, unit, and how to read the value from the
+# metrics of the heater.
+METRIC_SENSORS = (
+    ("poll_duration", "poll duration", "s", lambda m: m.last_poll_duration),
+    ("staleness", "data age", "s", lambda m: m.staleness),
+    ("api_calls", "API calls", None, lambda m: m.total("calls")),
+    ("api_errors", "API errors", None, lambda m: m.total("errors")),
+    ("api_timeouts", "API timeouts", None, lambda m: m.total("timeouts")),
+    ("api_retries", "API retries", None, lambda m: m.total("retries")),
+)
+# Sensors derived from the history of the heater: key, name, unit, device
+# class, state class, and how to read the value from the history and the
+# heater power in watts.
+TREND_SENSORS = (
+    (
+        "duty_cycle_1h",
+        "duty cycle 1h",
+        "%",
+        None,
+        "measurement",
+        lambda history, power: history.duty_cycle(3600),
+    ),
+    (
+        "duty_cycle_24h",
+        "duty cycle 24h",
+        "%",
+        None,
+        "measurement",
+        lambda history, power: history.duty_cycle(HISTORY_SPAN),
+    ),
+    (
+        "temperature_rate",
+        "temperature rate",
+        "°C/h",
+        None,
+        "measurement",
+        lambda history, power: history.temperature_rate(),
+    ),
+    (
+        "time_to_setpoint",
+        "time to setpoint",
+        "min",
+        None,
+        "measurement",
+        lambda history, power: history.time_to_setpoint(),
+    ),
+    (
+        "energy",
+        "estimated energy",
+        "kWh",
+        "energy",
+        "total_increasing",
+        lambda history, power: history.heating_seconds * power / 3600000,
+    ),
+)
+# Endpoints with a latency sensor.
+LATENCY_SENSORS = ("GetStatus", "GetParams", "SetParams")
 
 
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_devices([EldomTemperatureSensor(coordinator, entry)])
+    hub = hass.data[DOMAIN][entry.entry_id]
+    entities = []
+    for coordinator in hub.coordinators.values():
+        entities.append(EldomTemperatureSensor(coordinator, entry))
+        entities.extend(
+            EldomTrendSensor(coordinator, entry, *trend) for trend in TREND_SENSORS
+        )
+        entities.extend(
+            EldomMetricSensor(coordinator, entry, *metric) for metric in METRIC_SENSORS
+        )
+        entities.extend(
+            EldomLatencySensor(coordinator, entry, endpoint)
+            for endpoint in LATENCY_SENSORS
+        )
+    async_add_devices(entities)
 
 
-class EldomTemperatureSensor(EldomEntity):
+class EldomTemperatureSensor(EldomEntity, SensorEntity):
     """eldom_heater Sensor class."""
 
+    _attr_device_class = "temperature"
+    _attr_state_class = "measurement"
+    _attr_native_unit_of_measurement = "°C"
+
+    watched_fields = frozenset(
+        {"temperature", "setpoint", "operation", "lock", "antifrost"}
+    )
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this entity."""
+        return f"{self.coordinator.unique_id}_temperature"
+
     @property
     def name(self):
         """Return the name of the sensor."""
-        return f"{DEFAULT_NAME}_temperature"
+        return f"{self.device_name} temperature"
 
     @property
-    def state(self):
+    def native_value(self):
         """Return the state of the sensor."""
-        temp = self.coordinator.data["T"]
-        temp = f"{temp[0:2]}.{temp[2:3]}"
-        return temp
+        return self.coordinator.data.temperature / 10
 
     @property
     def icon(self):
@@ -32,20 +121,153 @@ class EldomTemperatureSensor(EldomEntity):
         return ICON_SETPOINT
 
     @property
-    def device_class(self):
-        """Return de device class of the sensor."""
-        return "temperature"
+    def extra_state_attributes(self):
+        """Return extra attributes"""
+        data = self.coordinator.data
+        return {
+            **super().extra_state_attributes,
+            "setpoint": data.setpoint / 10,
+            "operation": data.operation.name.lower(),
+            "lock": data.lock,
+            "antifrost": data.antifrost,
+        }
+
+
+class EldomTrendSensor(EldomEntity, SensorEntity):
+    """Value derived from the recent readings of a heater."""
+
+    _attr_icon = ICON_TREND
+
+    # The readings kept in the history.
+    watched_fields = frozenset({"temperature", "setpoint", "operation"})
+
+    def __init__(
+        self,
+        coordinator,
+        config_entry,
+        key,
+        name,
+        unit,
+        device_class,
+        state_class,
+        value,
+    ):
+        super().__init__(coordinator, config_entry)
+        self._key = key
+        self._name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._value = value
+        self._last_state = None
+
+    def _changed(self) -> bool:
+        """Also catch values moving with time alone, like the energy while heating."""
+        state = self.native_value
+        changed = state != self._last_state
+        self._last_state = state
+        return changed or super()._changed()
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this entity."""
+        return f"{self.coordinator.unique_id}_{self._key}"
 
     @property
-    def state_class(self):
-        """Return state"""
-        return "measurement"
+    def name(self):
+        """Return the name of the sensor."""
+        return f"{self.device_name} {self._name}"
 
     @property
-    def native_unit_of_measurement(self):
-        return "°C"
+    def native_value(self):
+        """Return the state of the sensor."""
+        power = self.config_entry.options.get(CONF_HEATER_POWER, DEFAULT_HEATER_POWER)
+        value = self._value(self.coordinator.history, power)
+        if value is None:
+            return None
+        return round(value, 2)
 
     @property
     def extra_state_attributes(self):
-        """Return extra attributes"""
-        return self.coordinator.data
+        """Return no attributes"""
+        return None
+
+
+class EldomMetricSensor(EldomEntity, SensorEntity):
+    """Request or poll metric of a heater, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = ICON_METRIC
+
+    watched_fields = None
+
+    def __init__(self, coordinator, config_entry, key, name, unit, value):
+        super().__init__(coordinator, config_entry)
+        self._key = key
+        self._name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = "total_increasing" if unit is None else "measurement"
+        self._value = value
+
+    @property
+    def available(self):
+        """Return True, metrics are meaningful while the heater is unreachable."""
+        return True
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this entity."""
+        return f"{self.coordinator.unique_id}_{self._key}"
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return f"{self.device_name} {self._name}"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        value = self._value(self.coordinator.api.metrics)
+        if isinstance(value, float):
+            return round(value, 3)
+        return value
+
+    @property
+    def extra_state_attributes(self):
+        """Return no attributes"""
+        return None
+
+
+class EldomLatencySensor(EldomMetricSensor):
+    """Mean latency of one endpoint, with its counters and histogram."""
+
+    def __init__(self, coordinator, config_entry, endpoint):
+        super().__init__(
+            coordinator,
+            config_entry,
+            f"{endpoint.lower()}_latency",
+            f"{endpoint} latency",
+            "s",
+            None,
+        )
+        self._endpoint = endpoint
+
+    @property
+    def _metrics(self):
+        """Return the metrics of the endpoint, None until it is called."""
+        return self.coordinator.api.metrics.endpoints.get(self._endpoint)
+
+    @property
+    def native_value(self):
+        """Return the mean latency of the endpoint."""
+        if self._metrics is None or self._metrics.latency_mean is None:
+            return None
+        return round(self._metrics.latency_mean, 3)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the counters and latency histogram of the endpoint"""
+        if self._metrics is None:
+            return None
+        return self._metrics.as_dict()
@@ -0,0 +1,189 @@
+"""Services of the eldom integration."""
+import asyncio
+import logging
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.components.climate.const import ATTR_HVAC_MODE
+from homeassistant.components.climate.const import HVAC_MODE_HEAT
+from homeassistant.components.climate.const import HVAC_MODE_OFF
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.service import async_extract_entity_ids
+
+from .const import CLIMATE
+from .const import DOMAIN
+from .schedule import DAYS
+from .schedule import WeeklyProgram
+
+SERVICE_BULK_SET = "bulk_set"
+EVENT_BULK_SET_RESULT = f"{DOMAIN}_bulk_set_result"
+SERVICE_SET_SCHEDULE = "set_schedule"
+EVENT_SET_SCHEDULE_RESULT = f"{DOMAIN}_set_schedule_result"
+BULK_SET_CONCURRENCY = 8
+
+
+def _whole_degrees(value) -> int:
+    """Validate a setpoint, which heaters only take in whole degrees."""
+    value = vol.Coerce(float)(value)
+    if not value.is_integer():
+        raise vol.Invalid(f"{value} is not a whole number of degrees")
+    return int(value)
+
+
+BULK_SET_SCHEMA = vol.All(
+    cv.make_entity_service_schema(
+        {
+            vol.Optional(ATTR_TEMPERATURE): _whole_degrees,
+            vol.Optional(ATTR_HVAC_MODE): vol.In([HVAC_MODE_HEAT, HVAC_MODE_OFF]),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_TEMPERATURE, ATTR_HVAC_MODE),
+)
+
+
+def _periods(value) -> list:
+    """Validate a list of "HH:MM-HH:MM" periods."""
+    periods = vol.All(cv.ensure_list, [cv.string])(value)
+    try:
+        WeeklyProgram.parse_periods(periods)
+    except ValueError as exception:
+        raise vol.Invalid(str(exception)) from exception
+    return periods
+
+
+SET_SCHEDULE_SCHEMA = vol.All(
+    cv.make_entity_service_schema({vol.Optional(day): _periods for day in DAYS}),
+    cv.has_at_least_one_key(*DAYS),
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the eldom services."""
+
+    async def async_bulk_set(call: ServiceCall) -> None:
+        await _async_bulk_set(hass, call)
+
+    async def async_set_schedule(call: ServiceCall) -> None:
+        await _async_set_schedule(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BULK_SET, async_bulk_set, schema=BULK_SET_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_SCHEDULE, async_set_schedule, schema=SET_SCHEDULE_SCHEMA
+    )
+
+
+@callback
+def _async_coordinators(hass: HomeAssistant) -> dict:
+    """Return the coordinators of every loaded entry, by heater uuid."""
+    coordinators = {}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        hub = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+        if hub is not None:
+            coordinators.update(hub.coordinators)
+    return coordinators
+
+
+async def _async_fan_out(
+    hass: HomeAssistant, call: ServiceCall, apply, event: str
+) -> None:
+    """Apply a change to every targeted heater, and report the outcome.
+
+    apply is awaited with each coordinator, at most BULK_SET_CONCURRENCY at
+    a time, and returns whether the write was confirmed (None if nothing
+    was written) and details for the report. Heaters whose writes were not
+    confirmed are refreshed together afterwards. The outcome per entity is
+    fired as an event.
+    """
+    registry = er.async_get(hass)
+    coordinators = _async_coordinators(hass)
+    report = {}
+    targets = {}
+    for entity_id in sorted(await async_extract_entity_ids(hass, call)):
+        entity_entry = registry.async_get(entity_id)
+        coordinator = None
+        if (
+            entity_entry is not None
+            and entity_entry.platform == DOMAIN
+            and entity_entry.domain == CLIMATE
+        ):
+            coordinator = coordinators.get(entity_entry.unique_id)
+        if coordinator is None:
+            report[entity_id] = {"success": False, "error": "not a loaded eldom heater"}
+        else:
+            targets[entity_id] = coordinator
+
+    semaphore = asyncio.Semaphore(BULK_SET_CONCURRENCY)
+
+    async def _async_apply(coordinator) -> tuple:
+        async with semaphore:
+            return await apply(coordinator)
+
+    results = await asyncio.gather(
+        *[_async_apply(coordinator) for coordinator in targets.values()],
+        return_exceptions=True,
+    )
+
+    refresh = []
+    for (entity_id, coordinator), result in zip(targets.items(), results):
+        if isinstance(result, BaseException):
+            report[entity_id] = {"success": False, "error": str(result)}
+            refresh.append(coordinator)
+            continue
+        confirmed, details = result
+        report[entity_id] = {"success": True, **details}
+        if confirmed is False:
+            refresh.append(coordinator)
+    await asyncio.gather(*[coordinator.async_refresh() for coordinator in refresh])
+
+    failed = [
+        entity_id for entity_id, result in report.items() if not result["success"]
+    ]
+    if failed:
+        _LOGGER.warning("%s failed for %s", call.service, ", ".join(failed))
+    hass.bus.async_fire(event, {"results": report})
+
+
+async def _async_bulk_set(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Set the mode and/or setpoint of many heaters at once."""
+    on = None
+    if ATTR_HVAC_MODE in call.data:
+        on = call.data[ATTR_HVAC_MODE] == HVAC_MODE_HEAT
+    setpoint = call.data.get(ATTR_TEMPERATURE)
+
+    async def _async_apply(coordinator) -> tuple:
+        confirmed = await coordinator.commands.async_apply(on=on, setpoint=setpoint)
+        return confirmed, {}
+
+    await _async_fan_out(hass, call, _async_apply, EVENT_BULK_SET_RESULT)
+
+
+async def _async_set_schedule(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Replace days of the weekly program of many heaters.
+
+    Each heater is compared with its cached program, and only heaters whose
+    program actually changes get a SetParams call.
+    """
+    changes = {day: call.data[day] for day in DAYS if day in call.data}
+
+    async def _async_apply(coordinator) -> tuple:
+        program = coordinator.data.program
+        if program is None:
+            raise HomeAssistantError("AutoTimeSet has an unsupported format")
+        new_program = program.replace(changes)
+        changed_days = new_program.changed_days(program)
+        if not changed_days:
+            return None, {"changed_days": []}
+        confirmed = await coordinator.commands.async_apply(program=new_program)
+        return confirmed, {"changed_days": changed_days}
+
+    await _async_fan_out(hass, call, _async_apply, EVENT_SET_SCHEDULE_RESULT)
@@ -0,0 +1,57 @@
+"""HTTP session shared by every eldom entry and flow."""
+import asyncio
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import callback
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.util.ssl import client_context
+
+from .const import DOMAIN
+
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 16
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+DATA_SESSION = "session"
+DATA_SESSION_LOCK = "session_lock"
+
+
+async def async_get_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Return the session to iot.myeldom.com, creating it on first use.
+
+    The connector keeps connections alive, caches DNS lookups, limits the
+    connections per host and verifies TLS with one SSL context, so polls
+    reuse warm connections instead of opening a new one each time.
+    """
+    data = hass.data.setdefault(DOMAIN, {})
+    # Entries set up in parallel must not each create a session.
+    async with data.setdefault(DATA_SESSION_LOCK, asyncio.Lock()):
+        session = data.get(DATA_SESSION)
+        if session is None or session.closed:
+            session = data[DATA_SESSION] = await _async_create_session(hass)
+    return session
+
+
+async def _async_create_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    ssl_context = await hass.async_add_executor_job(client_context)
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+        ssl=ssl_context,
+    )
+    session = aiohttp.ClientSession(connector=connector)
+
+    @callback
+    def _async_close_session(event: Event) -> None:
+        """Close the session when Home Assistant stops."""
+        hass.async_create_task(session.close())
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return session
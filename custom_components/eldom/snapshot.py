@@ -0,0 +1,124 @@
+"""Decoded state of an eldom heater."""
+from enum import Enum
+
+from .schedule import WeeklyProgram
+
+# Typed fields of a snapshot.
+FIELDS = ("temperature", "setpoint", "operation", "lock", "antifrost")
+# Fields of a GetStatus response kept in a snapshot.
+STATUS_KEYS = ("T", "Operation")
+# Fields of a GetParams response kept in a snapshot, and sent back by SetParams.
+PARAMETER_KEYS = (
+    "TSet",
+    "ID",
+    "Lock",
+    "Rate1",
+    "Rate2",
+    "Antifrost",
+    "AutoTimeSet",
+    "SystemSettings",
+)
+
+
+class Operation(Enum):
+    """Operation reported by a heater."""
+
+    OFF = "0"
+    HEAT = "16"
+
+    @classmethod
+    def from_raw(cls, value) -> "Operation":
+        """Decode the Operation field, anything but heating meaning off."""
+        if str(value) == cls.HEAT.value:
+            return cls.HEAT
+        return cls.OFF
+
+
+def parse_tenths(value) -> int:
+    """Decode a "215" style temperature into tenths of a degree."""
+    value = str(value)
+    return int(value[0:2]) * 10 + int(value[2:3] or 0)
+
+
+def format_tenths(value: int) -> str:
+    """Encode tenths of a degree the way the heater reports them."""
+    return f"{value:03d}"
+
+
+def _flag(value) -> bool:
+    """Decode a Lock/Antifrost style flag."""
+    return str(value).lower() in ("1", "true", "on")
+
+
+class EldomSnapshot:
+    """State of a heater, decoded once per poll.
+
+    Temperatures are kept as tenths of a degree. The raw fields are kept
+    alongside, to build SetParams payloads and diagnostics.
+    """
+
+    __slots__ = ("temperature", "setpoint", "operation", "lock", "antifrost", "_raw")
+
+    def __init__(self, raw: dict) -> None:
+        """Initialize from the merged GetStatus and GetParams fields."""
+        self._raw = raw
+        self.temperature = parse_tenths(raw["T"])
+        self.setpoint = parse_tenths(raw["TSet"])
+        self.operation = Operation.from_raw(raw["Operation"])
+        self.lock = _flag(raw["Lock"])
+        self.antifrost = _flag(raw["Antifrost"])
+
+    @classmethod
+    def from_responses(cls, status: dict, parameters: dict) -> "EldomSnapshot":
+        """Decode a GetStatus and a GetParams response."""
+        raw = {key: status[key] for key in STATUS_KEYS}
+        raw.update({key: parameters[key] for key in PARAMETER_KEYS})
+        return cls(raw)
+
+    @property
+    def is_heating(self) -> bool:
+        """Return True if the heater is on."""
+        return self.operation is Operation.HEAT
+
+    @property
+    def program(self) -> WeeklyProgram:
+        """Return the decoded weekly program, None if it cannot be decoded."""
+        try:
+            return WeeklyProgram.from_raw(self._raw["AutoTimeSet"])
+        except (KeyError, ValueError):
+            return None
+
+    def changed_fields(self, previous: "EldomSnapshot") -> frozenset:
+        """Return the typed and raw fields that differ from a previous snapshot."""
+        if previous is None:
+            return frozenset(FIELDS) | frozenset(self._raw)
+        changed = {
+            field
+            for field in FIELDS
+            if getattr(self, field) != getattr(previous, field)
+        }
+        changed.update(
+            key for key, value in self._raw.items() if previous._raw.get(key) != value
+        )
+        return frozenset(changed)
+
+    def raw(self, key: str):
+        """Return a raw field."""
+        return self._raw[key]
+
+    def merge(self, changes: dict) -> "EldomSnapshot":
+        """Return a new snapshot with some raw fields replaced."""
+        raw = dict(self._raw)
+        raw.update({key: value for key, value in changes.items() if key in raw})
+        return EldomSnapshot(raw)
+
+    def parameters(self) -> dict:
+        """Return the fields of a SetParams request."""
+        parameters = {key: self._raw[key] for key in PARAMETER_KEYS}
+        parameters["CRC"] = "00000000"
+        parameters["CID"] = "1"
+        return parameters
+
+    def as_dict(self) -> dict:
+        """Return the raw fields."""
+        return dict(self._raw)
@@ -0,0 +1,70 @@
+"""Last known snapshot of every heater, kept across restarts."""
+import time
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .snapshot import EldomSnapshot
+
+STORAGE_KEY = f"{DOMAIN}.snapshots"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+DATA_SNAPSHOT_STORE = "snapshot_store"
+
+
+async def async_get_snapshot_store(hass: HomeAssistant) -> "EldomSnapshotStore":
+    """Return the snapshot store, loading it from storage on first use."""
+    store = hass.data.setdefault(DOMAIN, {}).get(DATA_SNAPSHOT_STORE)
+    if store is None:
+        store = EldomSnapshotStore(hass)
+        await store.async_load()
+        hass.data[DOMAIN][DATA_SNAPSHOT_STORE] = store
+    return store
+
+
+class EldomSnapshotStore:
+    """Map of uuid to the raw fields of the last good snapshot.
+
+    Writes are delayed by SAVE_DELAY and merged, Home Assistant flushes any
+    pending write when it stops.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._snapshots = {}
+
+    async def async_load(self) -> None:
+        """Load the snapshots from storage."""
+        data = await self._store.async_load()
+        if data is not None:
+            self._snapshots = data
+
+    def get(self, uuid: str) -> tuple:
+        """Return the last snapshot of a heater and its timestamp, or None."""
+        entry = self._snapshots.get(uuid)
+        if entry is None:
+            return None
+        try:
+            return EldomSnapshot(entry["raw"]), entry["updated"]
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @callback
+    def async_set(self, uuid: str, snapshot: EldomSnapshot, updated: float = None):
+        """Remember the snapshot of a heater, and schedule a write."""
+        self._snapshots[uuid] = {
+            "updated": time.time() if updated is None else updated,
+            "raw": snapshot.as_dict(),
+        }
+        self._store.async_delay_save(lambda: self._snapshots, SAVE_DELAY)
+
+    @callback
+    def async_remove(self, uuids) -> None:
+        """Forget heaters."""
+        removed = [self._snapshots.pop(uuid, None) for uuid in uuids]
+        if any(entry is not None for entry in removed):
+            self._store.async_delay_save(lambda: self._snapshots, SAVE_DELAY)
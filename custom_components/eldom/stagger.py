@@ -0,0 +1,123 @@
+"""Poll staggering and rate reporting shared by every eldom entry."""
+import asyncio
+import math
+import time
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+
+from .const import DEFAULT_MAX_CONCURRENT_POLLS
+from .const import DOMAIN
+
+# Span of the reported rates, in seconds.
+RATE_WINDOW = 60
+
+DATA_STAGGER = "stagger"
+
+
+@callback
+def async_get_stagger(hass: HomeAssistant) -> "PollStagger":
+    """Return the poll stagger shared by every entry."""
+    stagger = hass.data.setdefault(DOMAIN, {}).get(DATA_STAGGER)
+    if stagger is None:
+        stagger = hass.data[DOMAIN][DATA_STAGGER] = PollStagger()
+    return stagger
+
+
+class PollStagger:
+    """Spread the polls of every heater evenly, and bound them globally.
+
+    Each registered heater gets a phase, its share of the poll period, and
+    its polls are pushed to the next time matching that phase. Used as an
+    async context manager, the stagger also bounds the polls in flight
+    across all entries. Polls and requests are counted per second over the
+    last RATE_WINDOW seconds.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_CONCURRENT_POLLS) -> None:
+        """Initialize."""
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._phases = {}
+        self.in_flight = 0
+        self._polls = [0] * RATE_WINDOW
+        self._requests = [0] * RATE_WINDOW
+        self._second = int(time.monotonic())
+
+    async def __aenter__(self) -> None:
+        await self._semaphore.acquire()
+        self.in_flight += 1
+
+    async def __aexit__(self, *args) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @callback
+    def register(self, key: str) -> None:
+        """Give a heater a phase, spreading every phase evenly again."""
+        self._phases[key] = 0.0
+        self._spread()
+
+    @callback
+    def unregister(self, key: str) -> None:
+        """Release the phase of a heater."""
+        if self._phases.pop(key, None) is not None:
+            self._spread()
+
+    def _spread(self) -> None:
+        keys = sorted(self._phases)
+        for index, key in enumerate(keys):
+            self._phases[key] = index / len(keys)
+
+    def delay(self, key: str, interval: float, period: float) -> float:
+        """Return the delay of the first poll due after interval, on phase.
+
+        Poll times fall on a grid of `period` seconds, offset by the phase
+        of the heater.
+        """
+        phase = self._phases.get(key)
+        if phase is None or period <= 0:
+            return interval
+        now = time.time()
+        offset = phase * period
+        due = math.ceil((now + interval - offset) / period) * period + offset
+        return due - now
+
+    def _advance(self) -> int:
+        """Clear the counts of the seconds that went by, return the current one."""
+        second = int(time.monotonic())
+        if second - self._second >= RATE_WINDOW:
+            self._polls = [0] * RATE_WINDOW
+            self._requests = [0] * RATE_WINDOW
+        else:
+            for elapsed in range(self._second + 1, second + 1):
+                self._polls[elapsed % RATE_WINDOW] = 0
+                self._requests[elapsed % RATE_WINDOW] = 0
+        self._second = second
+        return second % RATE_WINDOW
+
+    def record_poll(self, requests: int) -> None:
+        """Count a poll, and the requests it took."""
+        index = self._advance()
+        self._polls[index] += 1
+        self._requests[index] += requests
+
+    @property
+    def polls_per_second(self) -> float:
+        """Return the polls per second over the last RATE_WINDOW seconds."""
+        self._advance()
+        return sum(self._polls) / RATE_WINDOW
+
+    @property
+    def requests_per_second(self) -> float:
+        """Return the requests per second over the last RATE_WINDOW seconds."""
+        self._advance()
+        return sum(self._requests) / RATE_WINDOW
+
+    def as_dict(self) -> dict:
+        """Return the state of the stagger."""
+        return {
+            "heaters": len(self._phases),
+            "in_flight": self.in_flight,
+            "polls_per_second": self.polls_per_second,
+            "requests_per_second": self.requests_per_second,
+        }
@@ -1 +1 @@
-"""Tests for eldom_heater integration."""
+"""Tests for eldom integration."""
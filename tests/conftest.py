@@ -1,7 +1,16 @@
-"""Global fixtures for eldom_heater integration."""
+"""Global fixtures for eldom integration."""
 from unittest.mock import patch
 
 import pytest
+from custom_components.eldom import breaker
+from custom_components.eldom import limiter
+from custom_components.eldom import priority
+from custom_components.eldom.api import EldomApiAuthError
+from custom_components.eldom.api import EldomApiCommunicationError
+
+from .const import MOCK_DEVICES
+from .const import MOCK_PARAMETERS
+from .const import MOCK_STATUS
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 
@@ -18,22 +27,49 @@ def skip_notifications_fixture():
         yield
 
 
-# This fixture, when used, will result in calls to async_get_data to return None. To have the call
-# return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
+# Circuit breakers, rate limiters and request queues are shared by the whole
+# process, so a test simulating an outage must not leave an open breaker behind
+# for the next one.
+@pytest.fixture(name="reset_breakers", autouse=True)
+def reset_breakers_fixture():
+    """Forget the state of the circuit breakers, rate limiters and queues."""
+    yield
+    breaker._BREAKERS.clear()
+    limiter._LIMITERS.clear()
+    priority._QUEUES.clear()
+
+
+# This fixture, when used, will result in the cloud calls returning canned data: a valid
+# token, one heater on the account and its status and parameters.
 @pytest.fixture(name="bypass_get_data")
 def bypass_get_data_fixture():
     """Skip calls to get data from API."""
-    with patch("custom_components.eldom_heater.EldomHeaterApiClient.async_get_data"):
+    with patch(
+        "custom_components.eldom.credentials.EldomCredentials.async_refresh",
+        return_value="token",
+    ), patch(
+        "custom_components.eldom.device_index.EldomDeviceIndex.async_get_devices",
+        return_value=MOCK_DEVICES,
+    ), patch(
+        "custom_components.eldom.EldomApiClient.async_get_status_and_parameters",
+        return_value=(MOCK_STATUS, MOCK_PARAMETERS),
+    ):
         yield
 
 
-# In this fixture, we are forcing calls to async_get_data to raise an Exception. This is useful
+# In this fixture, we are forcing the cloud calls to raise. This is useful
 # for exception handling.
 @pytest.fixture(name="error_on_get_data")
 def error_get_data_fixture():
     """Simulate error when retrieving data from API."""
     with patch(
-        "custom_components.eldom_heater.EldomHeaterApiClient.async_get_data",
-        side_effect=Exception,
+        "custom_components.eldom.credentials.EldomCredentials.async_refresh",
+        side_effect=EldomApiAuthError,
+    ), patch(
+        "custom_components.eldom.device_index.EldomDeviceIndex.async_get_devices",
+        return_value=MOCK_DEVICES,
+    ), patch(
+        "custom_components.eldom.EldomApiClient.async_get_status_and_parameters",
+        side_effect=EldomApiCommunicationError,
     ):
         yield
@@ -1,9 +1,42 @@
-"""Constants for eldom_heater tests."""
-from custom_components.eldom_heater.const import (
-    CONF_PASSWORD,
-)
-from custom_components.eldom_heater.const import (
-    CONF_USERNAME,
-)
+"""Constants for eldom tests."""
+from custom_components.eldom.const import CONF_DEVICE_ID
+from custom_components.eldom.const import CONF_DEVICES
+from custom_components.eldom.const import CONF_FRIENDLY_NAME
+from custom_components.eldom.const import CONF_UNIQUE_ID
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.const import CONF_USERNAME
 
 MOCK_CONFIG = {CONF_USERNAME: "test_username", CONF_PASSWORD: "test_password"}
+
+MOCK_DEVICES = [
+    {
+        CONF_UNIQUE_ID: "uuid-0000",
+        CONF_DEVICE_ID: "pair-0000",
+        CONF_FRIENDLY_NAME: "Heater 0",
+    }
+]
+
+MOCK_ENTRY_DATA = {**MOCK_CONFIG, CONF_DEVICES: MOCK_DEVICES}
+
+MOCK_STATUS = {
+    "CID": "1",
+    "CRC": "00000000",
+    "ID": "pair-0000",
+    "Req": "GetStatus",
+    "T": "195",
+    "Operation": "16",
+}
+
+MOCK_PARAMETERS = {
+    "CID": "1",
+    "CRC": "00000000",
+    "Req": "GetParams",
+    "TSet": "210",
+    "ID": "pair-0000",
+    "Lock": "0",
+    "Rate1": "1",
+    "Rate2": "2",
+    "Antifrost": "0",
+    "AutoTimeSet": "0" * 84,
+    "SystemSettings": "00",
+}
@@ -0,0 +1,226 @@
+"""Local stand-in for the Eldom cloud, for tests and benchmarks."""
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+def constant(seconds: float):
+    """Return a latency distribution always answering `seconds`."""
+    return lambda: seconds
+
+
+def uniform(low: float, high: float):
+    """Return a latency distribution uniform between low and high."""
+    return lambda: random.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float = 0.5):
+    """Return a long-tailed latency distribution around a median."""
+    mu = math.log(median)
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+def make_token(lifetime: float) -> str:
+    """Return a JWT-shaped token expiring after lifetime seconds."""
+
+    def encode(value: dict) -> str:
+        raw = json.dumps(value).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    header = encode({"alg": "none"})
+    payload = encode({"exp": time.time() + lifetime, "nonce": random.random()})
+    return f"{header}.{payload}.signature"
+
+
+class FakeHeater:
+    """State of one simulated heater."""
+
+    def __init__(self, index: int) -> None:
+        self.uuid = f"uuid-{index:04d}"
+        self.pair_token = f"pair-{index:04d}"
+        self.name = f"Heater {index}"
+        self.temperature = 180 + index % 50
+        self.params = {
+            "TSet": "210",
+            "ID": self.pair_token,
+            "Lock": "0",
+            "Rate1": "1",
+            "Rate2": "2",
+            "Antifrost": "0",
+            "AutoTimeSet": "0" * 84,
+            "SystemSettings": "00",
+        }
+        self.operation = "16"
+
+    def status(self) -> dict:
+        return {
+            "CID": "1",
+            "CRC": "00000000",
+            "ID": self.pair_token,
+            "Req": "GetStatus",
+            "T": f"{self.temperature:03d}",
+            "Operation": self.operation,
+        }
+
+    def parameters(self) -> dict:
+        return {"CID": "1", "CRC": "00000000", "Req": "GetParams", **self.params}
+
+
+class FakeEldomCloud:
+    """aiohttp application answering authenticate, device-list and direct-req.
+
+    latency is a callable returning the delay of each answer in seconds,
+    error_rate the share of requests answered with a 503,
+    token_lifetime the validity of issued tokens in seconds, and
+    batch_status the status answered to every batch, if any.
+    """
+
+    def __init__(
+        self,
+        heaters: int = 1,
+        latency=constant(0),
+        error_rate: float = 0.0,
+        token_lifetime: float = 3600,
+        batching: bool = False,
+        batch_status: int = None,
+        username: str = "test_username",
+        password: str = "test_password",
+    ) -> None:
+        self.heaters = {
+            heater.uuid: heater for heater in (FakeHeater(i) for i in range(heaters))
+        }
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_lifetime = token_lifetime
+        self.batching = batching
+        self.batch_status = batch_status
+        self.username = username
+        self.password = password
+        self.requests = Counter()
+        self._throttled = 0
+        self._retry_after = None
+        self._tokens = {}
+        self._runner = None
+        self.base_url = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/api/authenticate", self._authenticate)
+        self.app.router.add_get("/api/device-list", self._device_list)
+        self.app.router.add_post("/api/direct-req", self._direct_req)
+
+    async def start(self) -> str:
+        """Serve on a free local port, and return the base URL of the API."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/api/"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def throttle(self, requests: int, retry_after: str = None) -> None:
+        """Answer the next requests with a 429 and an optional Retry-After."""
+        self._throttled = requests
+        self._retry_after = retry_after
+
+    def expire_tokens(self) -> None:
+        """Invalidate every issued token."""
+        self._tokens.clear()
+
+    async def _answer(self, request: web.Request, name: str):
+        """Count a request and apply latency and errors, None if it may proceed."""
+        self.requests[name] += 1
+        await asyncio.sleep(self.latency())
+        if self._throttled > 0:
+            self._throttled -= 1
+            headers = {}
+            if self._retry_after is not None:
+                headers["Retry-After"] = self._retry_after
+            return web.Response(status=429, headers=headers)
+        if random.random() < self.error_rate:
+            return web.Response(status=503)
+        if name == "authenticate":
+            return None
+        token = request.headers.get("Authorization", "")[len("Bearer ") :]
+        if self._tokens.get(token, 0) < time.time():
+            return web.Response(status=401)
+        return None
+
+    async def _authenticate(self, request: web.Request) -> web.Response:
+        error = await self._answer(request, "authenticate")
+        if error is not None:
+            return error
+        body = await request.json()
+        if (body.get("username"), body.get("password")) != (
+            self.username,
+            self.password,
+        ):
+            return web.Response(status=401)
+        token = make_token(self.token_lifetime)
+        self._tokens[token] = time.time() + self.token_lifetime
+        return web.json_response({"id_token": token})
+
+    async def _device_list(self, request: web.Request) -> web.Response:
+        error = await self._answer(request, "device-list")
+        if error is not None:
+            return error
+        page = int(request.query.get("page", 1))
+        size = int(request.query.get("size", 10))
+        heaters = list(self.heaters.values())[(page - 1) * size : page * size]
+        return web.json_response(
+            [
+                {"uuid": heater.uuid, "pairTok": heater.pair_token, "name": heater.name}
+                for heater in heaters
+            ]
+        )
+
+    async def _direct_req(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        name = (
+            "direct-req:batch"
+            if isinstance(body, list)
+            else f"direct-req:{body['Req']}"
+        )
+        error = await self._answer(request, name)
+        if error is not None:
+            return error
+        heater = self.heaters.get(request.headers.get("ionic-idd"))
+        if heater is None:
+            return web.Response(status=404)
+        if isinstance(body, list):
+            if self.batch_status is not None:
+                return web.Response(status=self.batch_status)
+            if not self.batching:
+                return web.Response(status=400)
+            return web.json_response([self._handle(heater, item) for item in body])
+        return web.json_response(self._handle(heater, body))
+
+    @staticmethod
+    def _handle(heater: FakeHeater, body: dict) -> dict:
+        request = body["Req"]
+        if request == "GetStatus":
+            return heater.status()
+        if request == "GetParams":
+            return heater.parameters()
+        if request in ("On", "Off"):
+            heater.operation = "16" if request == "On" else "0"
+            return heater.status()
+        if request == "SetParams":
+            for key in heater.params:
+                if key in body:
+                    heater.params[key] = str(body[key])
+            if isinstance(body.get("TSet"), int):
+                heater.params["TSet"] = f"{body['TSet'] * 10:03d}"
+            return heater.parameters()
+        return {"Req": request}
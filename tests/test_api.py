@@ -1,87 +1,337 @@
-"""Tests for eldom_heater api."""
+"""Tests for eldom api."""
 import asyncio
+import time
 
 import aiohttp
-from custom_components.eldom_heater.api import (
-    EldomHeaterApiClient,
-)
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import pytest
+from custom_components.eldom import api
+from custom_components.eldom import priority
+from custom_components.eldom.api import EldomApiAuthError
+from custom_components.eldom.api import EldomApiClient
+from custom_components.eldom.api import EldomApiCommunicationError
+from custom_components.eldom.api import EldomApiRateLimitedError
+from custom_components.eldom.api import EldomApiUnavailableError
+from custom_components.eldom.breaker import get_breaker
+from custom_components.eldom.credentials import async_get_credentials
+from custom_components.eldom.credentials import EldomCredentials
+from custom_components.eldom.limiter import get_limiter
+from custom_components.eldom.priority import RequestQueue
 
+from .fake_cloud import constant
+from .fake_cloud import FakeEldomCloud
 
-async def test_api(hass, aioclient_mock, caplog):
-    """Test API calls."""
 
-    # To test the api submodule, we first create an instance of our API client
-    api = EldomHeaterApiClient("test", "test", async_get_clientsession(hass))
+@pytest.fixture(name="no_backoff")
+def no_backoff_fixture(monkeypatch):
+    """Retry without waiting."""
+    monkeypatch.setattr(api, "RETRY_BACKOFF", 0)
 
-    # Use aioclient_mock which is provided by `pytest_homeassistant_custom_components`
-    # to mock responses to aiohttp requests. In this case we are telling the mock to
-    # return {"test": "test"} when a `GET` call is made to the specified URL. We then
-    # call `async_get_data` which will make that `GET` request.
-    aioclient_mock.get(
-        "https://jsonplaceholder.typicode.com/posts/1", json={"test": "test"}
-    )
-    assert await api.async_get_data() == {"test": "test"}
-
-    # We do the same for `async_set_title`. Note the difference in the mock call
-    # between the previous step and this one. We use `patch` here instead of `get`
-    # because we know that `async_set_title` calls `api_wrapper` with `patch` as the
-    # first parameter
-    aioclient_mock.patch("https://jsonplaceholder.typicode.com/posts/1")
-    assert await api.async_set_title("test") is None
-
-    # In order to get 100% coverage, we need to test `api_wrapper` to test the code
-    # that isn't already called by `async_get_data` and `async_set_title`. Because the
-    # only logic that lives inside `api_wrapper` that is not being handled by a third
-    # party library (aiohttp) is the exception handling, we also want to simulate
-    # raising the exceptions to ensure that the function handles them as expected.
-    # The caplog fixture allows access to log messages in tests. This is particularly
-    # useful during exception handling testing since often the only action as part of
-    # exception handling is a logging statement
-    caplog.clear()
-    aioclient_mock.put(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=asyncio.TimeoutError
-    )
-    assert (
-        await api.api_wrapper("put", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Timeout error fetching information from" in caplog.record_tuples[0][2]
-    )
 
-    caplog.clear()
-    aioclient_mock.post(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=aiohttp.ClientError
-    )
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Error fetching information from" in caplog.record_tuples[0][2]
-    )
+async def _clients(cloud, session, credentials):
+    """Return a client per heater of the fake cloud, without rate limits."""
+    get_limiter(cloud.username, "127.0.0.1").configure(1000, 1000)
+    return [
+        EldomApiClient(
+            session,
+            credentials=credentials,
+            uuid=heater.uuid,
+            deviceId=heater.pair_token,
+            base_url=cloud.base_url,
+        )
+        for heater in cloud.heaters.values()
+    ]
+
+
+async def test_discovery_walks_every_page(hass):
+    """Test that the device list is not cut off after the first page."""
+    cloud = FakeEldomCloud(heaters=25)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        client = EldomApiClient(session, credentials=credentials, base_url=base_url)
+
+        devices = await client.async_get_devices()
+
+    await cloud.stop()
+    assert [device["uuid"] for device in devices] == list(cloud.heaters)
+    assert cloud.requests["device-list"] == 3
+    assert cloud.requests["authenticate"] == 1
+
+
+@pytest.mark.parametrize("batching", [True, False])
+async def test_poll_cycle(hass, batching):
+    """Test that a poll uses one batched call, or falls back to two calls.
+
+    The parameters are cached, so the second poll only gets the status.
+    """
+    cloud = FakeEldomCloud(batching=batching)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+
+        for _ in range(2):
+            status, parameters = await client.async_get_status_and_parameters()
+            assert status["T"] == "180"
+            assert parameters["TSet"] == "210"
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:batch"] == 1
+    assert cloud.requests["direct-req:GetStatus"] == (1 if batching else 2)
+    assert cloud.requests["direct-req:GetParams"] == (0 if batching else 1)
+
+
+async def test_expired_token_single_reauthentication(hass):
+    """Test that concurrent 401s share one authentication."""
+    cloud = FakeEldomCloud(heaters=20, batching=True)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        clients = await _clients(cloud, session, credentials)
+        await asyncio.gather(*[c.async_get_status_and_parameters() for c in clients])
+
+        cloud.expire_tokens()
+        await asyncio.gather(*[c.async_get_status_and_parameters() for c in clients])
+
+    await cloud.stop()
+    assert cloud.requests["authenticate"] == 2
+
+
+async def test_wrong_password(hass):
+    """Test that rejected credentials raise an authentication error."""
+    cloud = FakeEldomCloud()
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, "wrong", base_url=base_url
+        )
+        with pytest.raises(EldomApiAuthError):
+            await credentials.async_get_access_token()
+
+    await cloud.stop()
+
+
+async def test_outage_opens_the_breaker(hass, no_backoff, caplog):
+    """Test retries, the circuit breaker and the rate-limited error log."""
+    cloud = FakeEldomCloud(batching=True)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        await credentials.async_get_access_token()
+
+        cloud.error_rate = 1.0
+        with pytest.raises(EldomApiCommunicationError):
+            await client.async_get_status()
+        assert cloud.requests["direct-req:GetStatus"] == api.MAX_RETRIES + 1
+
+        with pytest.raises(EldomApiCommunicationError):
+            await client.async_get_status()
+        with pytest.raises(EldomApiUnavailableError):
+            await client.async_get_status()
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:GetStatus"] == 5
+    assert caplog.text.count("Error fetching information from") == 1
+
+    metrics = client.metrics.endpoint("GetStatus")
+    assert metrics.calls == 5
+    assert metrics.errors == 6
+    assert metrics.retries == 2 * api.MAX_RETRIES - 1
 
-    caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/2", exc=Exception)
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/2")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Something really wrong happened!" in caplog.record_tuples[0][2]
-    )
 
-    caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/3", exc=TypeError)
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/3")
-        is None
+async def test_shared_failures_count_once(hass, no_backoff, monkeypatch):
+    """Test that a failed request shared by queued polls counts once."""
+    cloud = FakeEldomCloud()
+    base_url = await cloud.start()
+    monkeypatch.setitem(
+        priority._QUEUES,
+        (cloud.username, "127.0.0.1"),
+        RequestQueue(max_in_flight=1),
     )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Error parsing information from" in caplog.record_tuples[0][2]
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        await credentials.async_get_access_token()
+
+        cloud.error_rate = 1.0
+        results = await asyncio.gather(
+            *[client.async_get_status() for _ in range(4)], return_exceptions=True
+        )
+
+    await cloud.stop()
+    assert all(
+        isinstance(r, (EldomApiCommunicationError, EldomApiUnavailableError))
+        for r in results
     )
+    failures = get_breaker("127.0.0.1").as_dict()["failures"]
+    assert failures == cloud.requests["direct-req:GetStatus"]
+
+
+async def test_metrics(hass):
+    """Test that answered calls are counted and timed per endpoint."""
+    cloud = FakeEldomCloud()
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        for _ in range(3):
+            await client.async_get_status_and_parameters()
+
+    await cloud.stop()
+    metrics = client.metrics
+    assert metrics.endpoint("GetStatus+GetParams").errors == 1
+    assert metrics.endpoint("GetStatus").calls == 3
+    assert sum(metrics.endpoint("GetParams").histogram) == 1
+    assert metrics.endpoint("GetParams").latency_mean < 1
+    assert metrics.total("timeouts") == 0
+
+
+async def test_failed_batch_probe_falls_back(hass):
+    """Test that a batch answered with a 503 is given up for separate requests."""
+    cloud = FakeEldomCloud(batching=True, batch_status=503)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        for _ in range(3):
+            client.invalidate_parameters()
+            status, parameters = await client.async_get_status_and_parameters()
+            assert status["T"] and parameters["TSet"]
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:batch"] == 1
+    assert cloud.requests["direct-req:GetParams"] == 3
+    assert client.metrics.total("retries") == 0
+    assert not get_breaker("127.0.0.1").is_open
+
+
+async def test_writes_invalidate_parameters(hass, monkeypatch):
+    """Test that parameters are fetched again after a write or the TTL."""
+    cloud = FakeEldomCloud(batching=True)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        _, parameters = await client.async_get_status_and_parameters()
+
+        await client.async_set_parameter({**parameters, "Req": "SetParams", "TSet": 23})
+        _, parameters = await client.async_get_status_and_parameters()
+        assert parameters["TSet"] == "230"
+
+        await client.async_get_status_and_parameters()
+        monkeypatch.setattr(api, "PARAMETERS_TTL", 0)
+        await client.async_get_status_and_parameters()
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:batch"] == 3
+    assert cloud.requests["direct-req:GetStatus"] == 1
+
+
+async def test_write_during_a_poll_is_not_cached_over(hass):
+    """Test that parameters fetched while a write lands are not cached."""
+    cloud = FakeEldomCloud(batching=True, latency=constant(0.2))
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        _, parameters = await client.async_get_status_and_parameters()
+        client.invalidate_parameters()
+
+        poll = asyncio.ensure_future(client.async_get_status_and_parameters())
+        await asyncio.sleep(0.05)
+        await client.async_set_parameter({**parameters, "Req": "SetParams", "TSet": 25})
+        _, stale = await poll
+        assert stale["TSet"] == "210"
+
+        _, parameters = await client.async_get_status_and_parameters()
+        assert parameters["TSet"] == "250"
+
+    await cloud.stop()
+
+
+async def test_rate_limiter_backpressure_and_retry_after(hass):
+    """Test that calls wait for the limiter, and slow down on a 429."""
+    cloud = FakeEldomCloud(batching=True)
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        limiter = get_limiter(cloud.username, "127.0.0.1")
+        limiter.configure(20, 20)
+        await credentials.async_get_access_token()
+
+        start = time.monotonic()
+        await asyncio.gather(*[client.async_get_status() for _ in range(40)])
+        assert time.monotonic() - start >= 0.9
+
+        cloud.throttle(1, retry_after="0.2")
+        start = time.monotonic()
+        await client.async_get_status()
+        assert time.monotonic() - start >= 0.2
+        assert limiter.rates[0] < 11
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:GetStatus"] == 42
+
+
+async def test_polls_give_up_on_long_pauses(hass, monkeypatch):
+    """Test that a poll fails cleanly when throttled beyond its deadline."""
+    monkeypatch.setattr(api, "TIMEOUT", 1)
+    cloud = FakeEldomCloud()
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        (client,) = await _clients(cloud, session, credentials)
+        await credentials.async_get_access_token()
+
+        cloud.throttle(1, retry_after="3")
+        start = time.monotonic()
+        with pytest.raises(EldomApiRateLimitedError) as error:
+            await client.async_get_status_and_parameters()
+        assert time.monotonic() - start < 1
+        assert error.value.retry_after > 2
+
+    await cloud.stop()
+
+
+async def test_shared_credentials_take_a_new_password(hass):
+    """Test that re-authenticating with a corrected password replaces the old one."""
+    cloud = FakeEldomCloud()
+    base_url = await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        stale = async_get_credentials(
+            hass, session, cloud.username, "wrong_password", base_url=base_url
+        )
+        with pytest.raises(EldomApiAuthError):
+            await stale.async_get_access_token()
+
+        credentials = async_get_credentials(
+            hass, session, cloud.username, cloud.password, base_url=base_url
+        )
+        assert credentials is stale
+        assert await credentials.async_get_access_token()
+
+    await cloud.stop()
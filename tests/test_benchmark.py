@@ -0,0 +1,118 @@
+"""Load benchmark of the eldom poll path against a local cloud stand-in.
+
+Skipped unless ELDOM_BENCHMARK is set, e.g.:
+
+    ELDOM_BENCHMARK=1 pytest -s tests/test_benchmark.py --no-cov
+"""
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import aiohttp
+import pytest
+from custom_components.eldom import EldomDataUpdateCoordinator
+from custom_components.eldom.api import EldomApiClient
+from custom_components.eldom.const import CONF_DEVICE_ID
+from custom_components.eldom.const import CONF_FRIENDLY_NAME
+from custom_components.eldom.const import CONF_UNIQUE_ID
+from custom_components.eldom.const import DEFAULT_MAX_CONCURRENT_POLLS
+from custom_components.eldom.credentials import EldomCredentials
+from custom_components.eldom.limiter import get_limiter
+from custom_components.eldom.scheduler import AdaptivePollInterval
+from custom_components.eldom.stagger import PollStagger
+
+from .fake_cloud import FakeEldomCloud
+from .fake_cloud import lognormal
+
+POLL_CYCLES = int(os.environ.get("ELDOM_BENCHMARK_CYCLES", 5))
+LATENCY_MEDIAN = float(os.environ.get("ELDOM_BENCHMARK_LATENCY", 0.05))
+POLL_RATE = float(os.environ.get("ELDOM_BENCHMARK_RATE", 1000))
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("ELDOM_BENCHMARK"), reason="set ELDOM_BENCHMARK to run"
+)
+
+
+async def _timed_refresh(coordinator: EldomDataUpdateCoordinator) -> float:
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    return time.perf_counter() - start
+
+
+@pytest.mark.parametrize("heaters", [1, 10, 100, 1000])
+@pytest.mark.parametrize("batching", [False, True])
+async def test_poll_benchmark(hass, heaters, batching):
+    """Poll every heater of an account a few times, and report the cost."""
+    cloud = FakeEldomCloud(
+        heaters=heaters, latency=lognormal(LATENCY_MEDIAN), batching=batching
+    )
+    base_url = await cloud.start()
+    session = aiohttp.ClientSession()
+    try:
+        credentials = EldomCredentials(
+            session, cloud.username, cloud.password, base_url=base_url
+        )
+        get_limiter(cloud.username, "127.0.0.1").configure(POLL_RATE, POLL_RATE)
+        stagger = PollStagger(DEFAULT_MAX_CONCURRENT_POLLS)
+        coordinators = []
+        for heater in cloud.heaters.values():
+            device = {
+                CONF_UNIQUE_ID: heater.uuid,
+                CONF_DEVICE_ID: heater.pair_token,
+                CONF_FRIENDLY_NAME: heater.name,
+            }
+            client = EldomApiClient(
+                session,
+                uuid=heater.uuid,
+                deviceId=heater.pair_token,
+                credentials=credentials,
+                base_url=base_url,
+            )
+            coordinators.append(
+                EldomDataUpdateCoordinator(
+                    hass,
+                    client=client,
+                    device=device,
+                    stagger=stagger,
+                    scheduler=AdaptivePollInterval(
+                        timedelta(seconds=15), timedelta(seconds=300)
+                    ),
+                )
+            )
+
+        tracemalloc.start()
+        latencies = []
+        cycles = []
+        for _ in range(POLL_CYCLES):
+            start = time.perf_counter()
+            latencies += await asyncio.gather(
+                *[_timed_refresh(coordinator) for coordinator in coordinators]
+            )
+            cycles.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        await session.close()
+        await cloud.stop()
+
+    assert all(coordinator.last_update_success for coordinator in coordinators)
+
+    polls = heaters * POLL_CYCLES
+    direct_requests = sum(
+        count for name, count in cloud.requests.items() if name.startswith("direct")
+    )
+    quantiles = statistics.quantiles(latencies, n=100)
+    p50, p90, p99 = quantiles[49], quantiles[89], quantiles[98]
+    print(
+        f"\nheaters={heaters} batching={batching} cycles={POLL_CYCLES}"
+        f"\n  poll latency p50={p50 * 1000:.1f}ms p90={p90 * 1000:.1f}ms"
+        f" p99={p99 * 1000:.1f}ms"
+        f"\n  cycle duration mean={statistics.mean(cycles):.2f}s"
+        f"\n  requests per poll={direct_requests / polls:.2f}"
+        f" requests per second={direct_requests / sum(cycles):.1f}"
+        f" authenticate={cloud.requests['authenticate']}"
+        f"\n  peak traced memory={peak / 1024:.0f}KiB"
+    )
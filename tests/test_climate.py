@@ -0,0 +1,130 @@
+"""Test eldom climate."""
+from unittest.mock import patch
+
+import pytest
+import voluptuous as vol
+from custom_components.eldom import async_setup
+from custom_components.eldom import async_setup_entry
+from custom_components.eldom.const import CLIMATE
+from custom_components.eldom.const import DOMAIN
+from custom_components.eldom.schedule import WeeklyProgram
+from custom_components.eldom.services import EVENT_BULK_SET_RESULT
+from custom_components.eldom.services import EVENT_SET_SCHEDULE_RESULT
+from custom_components.eldom.services import SERVICE_BULK_SET
+from custom_components.eldom.services import SERVICE_SET_SCHEDULE
+from homeassistant.components.climate.const import SERVICE_SET_TEMPERATURE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import ATTR_TEMPERATURE
+from pytest_homeassistant_custom_component.common import async_capture_events
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_ENTRY_DATA
+from .const import MOCK_PARAMETERS
+
+
+async def test_climate_services(hass, bypass_get_data):
+    """Test climate services."""
+    # Create a mock entry so we don't have to go through config flow
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+
+    # Functions/objects can be patched directly in test code as well and can be used to test
+    # additional things, like whether a function was called or what arguments it was called with
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_set_parameter",
+        return_value={**MOCK_PARAMETERS, "TSet": "230"},
+    ) as set_parameter:
+        await hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_TEMPERATURE,
+            service_data={ATTR_ENTITY_ID: f"{CLIMATE}.heater_0", ATTR_TEMPERATURE: 23},
+            blocking=True,
+        )
+        assert set_parameter.called
+        parameters = set_parameter.call_args[0][0]
+        assert parameters["Req"] == "SetParams"
+        assert parameters["TSet"] == 23
+
+    state = hass.states.get(f"{CLIMATE}.heater_0")
+    assert state.attributes[ATTR_TEMPERATURE] == 23
+
+
+async def test_bulk_set(hass, bypass_get_data):
+    """Test the bulk_set service and its per-entity report."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await async_setup(hass, {})
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+
+    events = async_capture_events(hass, EVENT_BULK_SET_RESULT)
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_set_parameter",
+        return_value={**MOCK_PARAMETERS, "TSet": "180"},
+    ) as set_parameter:
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BULK_SET,
+            service_data={
+                ATTR_ENTITY_ID: [f"{CLIMATE}.heater_0", f"{CLIMATE}.unknown"],
+                ATTR_TEMPERATURE: 18,
+            },
+            blocking=True,
+        )
+        assert set_parameter.call_count == 1
+        assert set_parameter.call_args[0][0]["TSet"] == 18
+
+    assert events[0].data["results"] == {
+        f"{CLIMATE}.heater_0": {"success": True},
+        f"{CLIMATE}.unknown": {
+            "success": False,
+            "error": "not a loaded eldom heater",
+        },
+    }
+
+    with pytest.raises(vol.Invalid):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BULK_SET,
+            service_data={
+                ATTR_ENTITY_ID: f"{CLIMATE}.heater_0",
+                ATTR_TEMPERATURE: 21.5,
+            },
+            blocking=True,
+        )
+
+
+async def test_set_schedule_skips_unchanged_programs(hass, bypass_get_data):
+    """Test that set_schedule only writes programs that change."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await async_setup(hass, {})
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+
+    program = WeeklyProgram.from_raw(MOCK_PARAMETERS["AutoTimeSet"]).replace(
+        {"monday": ["06:00-08:00"]}
+    )
+    events = async_capture_events(hass, EVENT_SET_SCHEDULE_RESULT)
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_set_parameter",
+        return_value={**MOCK_PARAMETERS, "AutoTimeSet": program.to_raw()},
+    ) as set_parameter:
+        for _ in range(2):
+            await hass.services.async_call(
+                DOMAIN,
+                SERVICE_SET_SCHEDULE,
+                service_data={
+                    ATTR_ENTITY_ID: f"{CLIMATE}.heater_0",
+                    "monday": ["06:00-08:00"],
+                },
+                blocking=True,
+            )
+        assert set_parameter.call_count == 1
+        assert set_parameter.call_args[0][0]["AutoTimeSet"] == program.to_raw()
+
+    assert [event.data["results"] for event in events] == [
+        {f"{CLIMATE}.heater_0": {"success": True, "changed_days": ["monday"]}},
+        {f"{CLIMATE}.heater_0": {"success": True, "changed_days": []}},
+    ]
@@ -0,0 +1,104 @@
+"""Tests for the eldom command queue."""
+import asyncio
+
+import aiohttp
+from custom_components.eldom.api import EldomApiClient
+from custom_components.eldom.commands import EldomCommandQueue
+from custom_components.eldom.credentials import EldomCredentials
+from custom_components.eldom.limiter import get_limiter
+from custom_components.eldom.snapshot import EldomSnapshot
+from custom_components.eldom.snapshot import Operation
+
+from .fake_cloud import FakeEldomCloud
+
+
+class _Coordinator:
+    """Stand-in for the coordinator of one heater."""
+
+    name = "Heater 0"
+
+    def __init__(self, api: EldomApiClient, data: EldomSnapshot) -> None:
+        self.api = api
+        self.data = data
+        self.refreshes = 0
+
+    def command_sent(self) -> None:
+        pass
+
+    def async_set_updated_data(self, data: EldomSnapshot) -> None:
+        self.data = data
+
+    async def async_request_refresh(self) -> None:
+        self.refreshes += 1
+
+
+async def _coordinator(cloud, session) -> _Coordinator:
+    """Return a coordinator of the first heater of the fake cloud, polled once."""
+    get_limiter(cloud.username, "127.0.0.1").configure(1000, 1000)
+    heater = next(iter(cloud.heaters.values()))
+    credentials = EldomCredentials(
+        session, cloud.username, cloud.password, base_url=cloud.base_url
+    )
+    client = EldomApiClient(
+        session,
+        credentials=credentials,
+        uuid=heater.uuid,
+        deviceId=heater.pair_token,
+        base_url=cloud.base_url,
+    )
+    status, parameters = await client.async_get_status_and_parameters()
+    return _Coordinator(client, EldomSnapshot.from_responses(status, parameters))
+
+
+def _returning(response: dict):
+    """Return a coroutine function answering response."""
+
+    async def _call(*args, **kwargs):
+        return response
+
+    return _call
+
+
+async def test_changes_within_the_debounce_are_merged(hass):
+    """Test that quick changes are sent as one call per request type."""
+    cloud = FakeEldomCloud()
+    await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        coordinator = await _coordinator(cloud, session)
+        queue = EldomCommandQueue(hass, coordinator)
+
+        await asyncio.gather(
+            queue.async_set(setpoint=22),
+            queue.async_set(on=False),
+            queue.async_set(setpoint=24),
+        )
+
+    await cloud.stop()
+    assert cloud.requests["direct-req:Off"] == 1
+    assert cloud.requests["direct-req:SetParams"] == 1
+    heater = next(iter(cloud.heaters.values()))
+    assert heater.params["TSet"] == "240"
+    assert heater.operation == "0"
+    assert coordinator.data.setpoint == 240
+    assert coordinator.data.operation is Operation.OFF
+
+
+async def test_only_unconfirmed_writes_are_refreshed(hass, monkeypatch):
+    """Test that a refresh follows a write only if its response disagrees."""
+    cloud = FakeEldomCloud()
+    await cloud.start()
+    async with aiohttp.ClientSession() as session:
+        coordinator = await _coordinator(cloud, session)
+        queue = EldomCommandQueue(hass, coordinator)
+
+        await queue.async_set(setpoint=24)
+        assert coordinator.refreshes == 0
+
+        # The heater answers with its setpoint from before the write.
+        stale = coordinator.data.parameters()
+        monkeypatch.setattr(coordinator.api, "async_set_parameter", _returning(stale))
+        await queue.async_set(setpoint=22)
+        assert coordinator.refreshes == 1
+
+    await cloud.stop()
+    assert coordinator.data.setpoint == 240
@@ -1,27 +1,23 @@
-"""Test eldom_heater config flow."""
+"""Test eldom config flow."""
 from unittest.mock import patch
 
 import pytest
-from custom_components.eldom_heater.const import (
-    BINARY_SENSOR,
-)
-from custom_components.eldom_heater.const import (
-    DOMAIN,
-)
-from custom_components.eldom_heater.const import (
-    PLATFORMS,
-)
-from custom_components.eldom_heater.const import (
-    SENSOR,
-)
-from custom_components.eldom_heater.const import (
-    SWITCH,
-)
+from custom_components.eldom.const import CLIMATE
+from custom_components.eldom.const import CONF_GRACE_PERIOD
+from custom_components.eldom.const import CONF_HEATER_POWER
+from custom_components.eldom.const import CONF_MAX_INTERVAL
+from custom_components.eldom.const import CONF_MIN_INTERVAL
+from custom_components.eldom.const import CONF_POLL_RATE
+from custom_components.eldom.const import CONF_WRITE_RATE
+from custom_components.eldom.const import DOMAIN
+from custom_components.eldom.const import PLATFORMS
+from custom_components.eldom.const import SENSOR
 from homeassistant import config_entries
 from homeassistant import data_entry_flow
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from .const import MOCK_CONFIG
+from .const import MOCK_ENTRY_DATA
 
 
 # This fixture bypasses the actual setup of the integration
@@ -30,8 +26,8 @@ from .const import MOCK_CONFIG
 @pytest.fixture(autouse=True)
 def bypass_setup_fixture():
     """Prevent setup."""
-    with patch("custom_components.eldom_heater.async_setup", return_value=True,), patch(
-        "custom_components.eldom_heater.async_setup_entry",
+    with patch("custom_components.eldom.async_setup", return_value=True,), patch(
+        "custom_components.eldom.async_setup_entry",
         return_value=True,
     ):
         yield
@@ -61,7 +57,7 @@ async def test_successful_config_flow(hass, bypass_get_data):
     # the input data
     assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
     assert result["title"] == "test_username"
-    assert result["data"] == MOCK_CONFIG
+    assert result["data"] == MOCK_ENTRY_DATA
     assert result["result"]
 
 
@@ -92,7 +88,7 @@ async def test_options_flow(hass):
     """Test an options flow."""
     # Create a new MockConfigEntry and add to HASS (we're bypassing config
     # flow entirely)
-    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
     entry.add_to_hass(hass)
 
     # Initialize an options flow
@@ -106,7 +102,15 @@ async def test_options_flow(hass):
     # Enter some fake data into the form
     result = await hass.config_entries.options.async_configure(
         result["flow_id"],
-        user_input={platform: platform != SENSOR for platform in PLATFORMS},
+        user_input={
+            **{platform: platform != SENSOR for platform in PLATFORMS},
+            CONF_MIN_INTERVAL: 15,
+            CONF_MAX_INTERVAL: 300,
+            CONF_GRACE_PERIOD: 900,
+            CONF_HEATER_POWER: 2000,
+            CONF_POLL_RATE: 5.0,
+            CONF_WRITE_RATE: 2.0,
+        },
     )
 
     # Verify that the flow finishes
@@ -114,4 +118,13 @@ async def test_options_flow(hass):
     assert result["title"] == "test_username"
 
     # Verify that the options were updated
-    assert entry.options == {BINARY_SENSOR: True, SENSOR: False, SWITCH: True}
+    assert entry.options == {
+        CLIMATE: True,
+        SENSOR: False,
+        CONF_MIN_INTERVAL: 15,
+        CONF_MAX_INTERVAL: 300,
+        CONF_GRACE_PERIOD: 900,
+        CONF_HEATER_POWER: 2000,
+        CONF_POLL_RATE: 5.0,
+        CONF_WRITE_RATE: 2.0,
+    }
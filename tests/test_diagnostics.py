@@ -0,0 +1,33 @@
+"""Test eldom diagnostics."""
+from custom_components.eldom import async_setup_entry
+from custom_components.eldom.const import CONF_ACCESS_TOKEN
+from custom_components.eldom.const import DOMAIN
+from custom_components.eldom.diagnostics import async_get_config_entry_diagnostics
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.const import CONF_PASSWORD
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_ENTRY_DATA
+
+
+async def test_diagnostics(hass, bypass_get_data):
+    """Test that diagnostics redact credentials and report the request state."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_DATA, CONF_ACCESS_TOKEN: "secret-token"},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await async_setup_entry(hass, config_entry)
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert diagnostics["entry"]["data"][CONF_PASSWORD] == REDACTED
+    assert diagnostics["entry"]["data"][CONF_ACCESS_TOKEN] == REDACTED
+    assert diagnostics["breaker"]["open"] is False
+    assert diagnostics["limiter"]["paused_for"] == 0
+    assert diagnostics["limiter"]["rates"] == diagnostics["limiter"]["configured_rates"]
+    device = diagnostics["devices"]["uuid-0000"]
+    assert device["available"]
+    assert device["data"]["TSet"] == "210"
+    assert "endpoints" in device["metrics"]
@@ -0,0 +1,59 @@
+"""Test eldom entity state writes."""
+from datetime import timedelta
+from unittest.mock import patch
+
+from custom_components.eldom import async_setup_entry
+from custom_components.eldom.api import EldomApiCommunicationError
+from custom_components.eldom.climate import EldomClimate
+from custom_components.eldom.const import CONF_GRACE_PERIOD
+from custom_components.eldom.const import DOMAIN
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_ENTRY_DATA
+from .const import MOCK_PARAMETERS
+from .const import MOCK_STATUS
+
+POLL = "custom_components.eldom.EldomApiClient.async_get_status_and_parameters"
+
+
+async def test_state_written_only_on_changes(hass, bypass_get_data):
+    """Test that a refresh writes the state only if it changes what is shown."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_ENTRY_DATA,
+        options={CONF_GRACE_PERIOD: 900},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinators["uuid-0000"]
+    warmer = {**MOCK_STATUS, "T": "200"}
+
+    with patch.object(EldomClimate, "async_write_ha_state") as write_state:
+        await coordinator.async_refresh()
+        assert write_state.call_count == 0
+
+        # A watched field changes.
+        with patch(POLL, return_value=(warmer, MOCK_PARAMETERS)):
+            await coordinator.async_refresh()
+        assert write_state.call_count == 1
+
+        # A field the climate entity does not show changes.
+        with patch(POLL, return_value=(warmer, {**MOCK_PARAMETERS, "Lock": "1"})):
+            await coordinator.async_refresh()
+        assert write_state.call_count == 1
+
+        # The data goes stale, then unavailable at the end of the grace period.
+        with patch(POLL, side_effect=EldomApiCommunicationError):
+            await coordinator.async_refresh()
+        assert write_state.call_count == 2
+
+        future = dt_util.utcnow() + timedelta(seconds=901)
+        with patch("homeassistant.util.dt.utcnow", return_value=future):
+            async_fire_time_changed(hass, future)
+            await hass.async_block_till_done()
+        assert write_state.call_count == 3
+        assert not coordinator.available
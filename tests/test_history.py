@@ -0,0 +1,49 @@
+"""Test eldom reading history."""
+import pytest
+from custom_components.eldom.history import EldomHistory
+from custom_components.eldom.history import HISTORY_SPAN
+from custom_components.eldom.snapshot import EldomSnapshot
+
+
+def _snapshot(temperature: int, heating: bool) -> EldomSnapshot:
+    return EldomSnapshot(
+        {
+            "T": f"{temperature:03d}",
+            "TSet": "220",
+            "Operation": "16" if heating else "0",
+            "Lock": "0",
+            "Antifrost": "0",
+        }
+    )
+
+
+def test_duty_cycle_and_energy():
+    """Test that the windows follow an hourly on/off cycle."""
+    history = EldomHistory(60)
+    # Heat during the first half of every hour, for three days.
+    for minute in range(3 * 24 * 60 + 1):
+        history.append(_snapshot(200, minute % 60 < 30), now=minute * 60)
+
+    assert history.duty_cycle(3600) == pytest.approx(50)
+    assert history.duty_cycle(HISTORY_SPAN) == pytest.approx(50)
+    assert history.heating_seconds == 36 * 3600
+
+
+def test_memory_is_bounded():
+    """Test that samples beyond the capacity overwrite the oldest ones."""
+    history = EldomHistory(600)
+    for minute in range(3 * 24 * 60):
+        history.append(_snapshot(200, True), now=minute * 60)
+
+    assert len(history) == HISTORY_SPAN // 600 + 1
+    assert history.duty_cycle(HISTORY_SPAN) == pytest.approx(100)
+
+
+def test_temperature_rate():
+    """Test the temperature rate and the time to reach the setpoint."""
+    history = EldomHistory(15)
+    for minute in range(10):
+        history.append(_snapshot(180 + minute, True), now=minute * 60)
+
+    assert history.temperature_rate() == pytest.approx(6)
+    assert history.time_to_setpoint() == pytest.approx(31)
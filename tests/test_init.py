@@ -1,24 +1,28 @@
-"""Test eldom_heater setup process."""
+"""Test eldom setup process."""
+from datetime import timedelta
+from unittest.mock import patch
+
 import pytest
-from custom_components.eldom_heater import (
-    async_reload_entry,
-)
-from custom_components.eldom_heater import (
-    async_setup_entry,
-)
-from custom_components.eldom_heater import (
-    async_unload_entry,
-)
-from custom_components.eldom_heater import (
-    EldomHeaterDataUpdateCoordinator,
-)
-from custom_components.eldom_heater.const import (
-    DOMAIN,
-)
+from custom_components.eldom import async_reload_entry
+from custom_components.eldom import async_setup_entry
+from custom_components.eldom import async_unload_entry
+from custom_components.eldom import EldomDataUpdateCoordinator
+from custom_components.eldom import EldomHub
+from custom_components.eldom.api import EldomApiCommunicationError
+from custom_components.eldom.const import CONF_GRACE_PERIOD
+from custom_components.eldom.const import DOMAIN
+from custom_components.eldom.snapshot import PARAMETER_KEYS
+from custom_components.eldom.snapshot_store import STORAGE_KEY
+from custom_components.eldom.snapshot_store import STORAGE_VERSION
+from homeassistant.const import STATE_UNAVAILABLE
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from .const import MOCK_CONFIG
+from .const import MOCK_ENTRY_DATA
+from .const import MOCK_PARAMETERS
+from .const import MOCK_STATUS
 
 
 # We can pass fixtures as defined in conftest.py to tell pytest to use the fixture
@@ -29,25 +33,21 @@ from .const import MOCK_CONFIG
 async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
     """Test entry setup and unload."""
     # Create a mock entry so we don't have to go through config flow
-    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
 
     # Set up the entry and assert that the values set during setup are where we expect
-    # them to be. Because we have patched the EldomHeaterDataUpdateCoordinator.async_get_data
-    # call, no code from custom_components/eldom_heater/api.py actually runs.
+    # them to be. Because we have patched the cloud calls, no request actually leaves.
     assert await async_setup_entry(hass, config_entry)
     assert DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]
-    assert (
-        type(hass.data[DOMAIN][config_entry.entry_id])
-        == EldomHeaterDataUpdateCoordinator
-    )
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+    assert type(hub) == EldomHub
+    assert type(hub.coordinators["uuid-0000"]) == EldomDataUpdateCoordinator
+    assert hub.coordinators["uuid-0000"].data.temperature == 195
 
     # Reload the entry and assert that the data from above is still there
     assert await async_reload_entry(hass, config_entry) is None
     assert DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]
-    assert (
-        type(hass.data[DOMAIN][config_entry.entry_id])
-        == EldomHeaterDataUpdateCoordinator
-    )
+    assert type(hass.data[DOMAIN][config_entry.entry_id]) == EldomHub
 
     # Unload the entry and verify that the data has been removed
     assert await async_unload_entry(hass, config_entry)
@@ -56,10 +56,115 @@ async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
 
 async def test_setup_entry_exception(hass, error_on_get_data):
     """Test ConfigEntryNotReady when API raises an exception during entry setup."""
-    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
 
     # In this case we are testing the condition where async_setup_entry raises
     # ConfigEntryNotReady using the `error_on_get_data` fixture which simulates
     # an error.
     with pytest.raises(ConfigEntryNotReady):
         assert await async_setup_entry(hass, config_entry)
+
+
+async def test_setup_entry_from_last_snapshot(hass, hass_storage, error_on_get_data):
+    """Test that a heater with a stored snapshot comes up while the cloud is down."""
+    hass_storage[STORAGE_KEY] = {
+        "version": STORAGE_VERSION,
+        "key": STORAGE_KEY,
+        "data": {
+            "uuid-0000": {
+                "updated": 0,
+                "raw": {
+                    "T": MOCK_STATUS["T"],
+                    "Operation": MOCK_STATUS["Operation"],
+                    **{key: MOCK_PARAMETERS[key] for key in PARAMETER_KEYS},
+                },
+            }
+        },
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+
+    assert await async_setup_entry(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinators["uuid-0000"]
+    assert coordinator.stale
+    assert coordinator.data.temperature == 195
+
+
+async def test_failed_polls_serve_stale_data(hass, bypass_get_data):
+    """Test that a failed poll keeps the last snapshot within the grace period."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_ENTRY_DATA,
+        options={CONF_GRACE_PERIOD: 900},
+        entry_id="test",
+    )
+    assert await async_setup_entry(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinators["uuid-0000"]
+
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_get_status_and_parameters",
+        side_effect=EldomApiCommunicationError,
+    ):
+        await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert coordinator.available
+    assert coordinator.stale
+    assert coordinator.data.temperature == 195
+
+    coordinator._grace_period = timedelta(0)
+    assert not coordinator.available
+
+    await coordinator.async_refresh()
+    assert coordinator.available
+    assert not coordinator.stale
+
+
+async def test_poll_overlapping_a_write_is_dropped(hass, bypass_get_data):
+    """Test that a poll answered before a write does not undo it."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    assert await async_setup_entry(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinators["uuid-0000"]
+
+    async def _poll_during_write(priority):
+        await coordinator.commands.async_apply(setpoint=23)
+        return MOCK_STATUS, MOCK_PARAMETERS
+
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_set_parameter",
+        return_value={**MOCK_PARAMETERS, "TSet": "230"},
+    ), patch(
+        "custom_components.eldom.EldomApiClient.async_get_status_and_parameters",
+        side_effect=_poll_during_write,
+    ):
+        await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.data.setpoint == 230
+
+
+async def test_entities_go_unavailable_after_the_grace_period(hass, bypass_get_data):
+    """Test that entities go unavailable once failed polls outlive the grace period."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_ENTRY_DATA,
+        options={CONF_GRACE_PERIOD: 900},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinators["uuid-0000"]
+
+    with patch(
+        "custom_components.eldom.EldomApiClient.async_get_status_and_parameters",
+        side_effect=EldomApiCommunicationError,
+    ):
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("climate.heater_0").state != STATE_UNAVAILABLE
+
+    future = dt_util.utcnow() + timedelta(seconds=901)
+    with patch("homeassistant.util.dt.utcnow", return_value=future):
+        async_fire_time_changed(hass, future)
+        await hass.async_block_till_done()
+    assert hass.states.get("climate.heater_0").state == STATE_UNAVAILABLE
@@ -0,0 +1,76 @@
+"""Test the headless poller."""
+import io
+import json
+
+import aiohttp
+import pytest
+from custom_components.eldom.__main__ import parse_args
+from custom_components.eldom.poller import EldomPoller
+
+from .fake_cloud import FakeEldomCloud
+
+
+async def test_poller_streams_ndjson():
+    """Test that every poll of every discovered heater gives one record."""
+    cloud = FakeEldomCloud(heaters=3, error_rate=0)
+    base_url = await cloud.start()
+    output = io.StringIO()
+    async with aiohttp.ClientSession() as session:
+        poller = EldomPoller(
+            session,
+            cloud.username,
+            cloud.password,
+            output,
+            base_url=base_url,
+            interval=0,
+            concurrency=2,
+            poll_rate=1000,
+        )
+        devices = await poller.async_discover(["uuid-0000", "uuid-0002"])
+        await poller.async_run(devices, count=2)
+    await cloud.stop()
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(records) == poller.polls == 4
+    assert poller.errors == 0
+    assert {record["uuid"] for record in records} == {"uuid-0000", "uuid-0002"}
+    assert records[0]["setpoint"] == 21.0
+    assert records[0]["operation"] == "heat"
+    assert records[0]["raw"]["TSet"] == "210"
+
+
+async def test_poller_records_failed_polls():
+    """Test that a failed poll gives an error record."""
+    cloud = FakeEldomCloud(heaters=1, error_rate=1)
+    base_url = await cloud.start()
+    output = io.StringIO()
+    async with aiohttp.ClientSession() as session:
+        poller = EldomPoller(
+            session,
+            cloud.username,
+            cloud.password,
+            output,
+            base_url=base_url,
+            interval=0,
+            poll_rate=1000,
+        )
+        await poller.async_run(
+            [{"uuid": "uuid-0000", "pairTok": "pair-0000", "name": "Heater 0"}],
+            count=1,
+        )
+    await cloud.stop()
+
+    record = json.loads(output.getvalue())
+    assert poller.errors == 1
+    assert "error" in record
+
+
+def test_parse_args(monkeypatch):
+    """Test the command line."""
+    monkeypatch.setenv("ELDOM_USERNAME", "test_username")
+    args = parse_args(["--interval", "0", "--concurrency", "16", "--count", "3"])
+    assert args.username == "test_username"
+    assert (args.interval, args.concurrency, args.count) == (0, 16, 3)
+
+    with pytest.raises(SystemExit):
+        parse_args(["--concurrency", "0"])
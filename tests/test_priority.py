@@ -0,0 +1,129 @@
+"""Test eldom request priorities."""
+import asyncio
+
+import pytest
+from custom_components.eldom.priority import PRIORITY_CONFIRM
+from custom_components.eldom.priority import PRIORITY_POLL
+from custom_components.eldom.priority import PRIORITY_WRITE
+from custom_components.eldom.priority import RequestQueue
+
+
+async def test_writes_jump_the_queue():
+    """Test that queued requests run by priority, then in arrival order."""
+    queue = RequestQueue(max_in_flight=1)
+    release = asyncio.Event()
+    order = []
+
+    def request(name):
+        async def _request():
+            order.append(name)
+            if name == "first":
+                await release.wait()
+            return name
+
+        return _request
+
+    tasks = [asyncio.ensure_future(queue.async_run(PRIORITY_POLL, request("first")))]
+    await asyncio.sleep(0)
+    for priority, name in (
+        (PRIORITY_POLL, "poll 1"),
+        (PRIORITY_POLL, "poll 2"),
+        (PRIORITY_CONFIRM, "confirm"),
+        (PRIORITY_WRITE, "write"),
+    ):
+        tasks.append(asyncio.ensure_future(queue.async_run(priority, request(name))))
+    await asyncio.sleep(0)
+    assert queue.waiting == 4
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["first", "write", "confirm", "poll 1", "poll 2"]
+    assert queue.in_flight == 0
+
+
+async def test_queued_polls_are_deduplicated():
+    """Test that identical queued polls are sent once."""
+    queue = RequestQueue(max_in_flight=1)
+    release = asyncio.Event()
+    sent = []
+
+    async def blocker():
+        await release.wait()
+
+    async def poll():
+        sent.append("poll")
+        return {"T": "200"}
+
+    first = asyncio.ensure_future(queue.async_run(PRIORITY_POLL, blocker))
+    await asyncio.sleep(0)
+    polls = [
+        asyncio.ensure_future(queue.async_run(PRIORITY_POLL, poll, key="device"))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*polls) == [{"T": "200"}] * 3
+    await first
+    assert sent == ["poll"]
+
+
+async def test_cancelled_request_frees_its_slot():
+    """Test that cancelling a waiting request does not leak a slot."""
+    queue = RequestQueue(max_in_flight=1)
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    async def request():
+        return "done"
+
+    first = asyncio.ensure_future(queue.async_run(PRIORITY_POLL, blocker))
+    await asyncio.sleep(0)
+    waiting = asyncio.ensure_future(queue.async_run(PRIORITY_POLL, request))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    release.set()
+    await first
+    assert await queue.async_run(PRIORITY_POLL, request) == "done"
+    assert queue.in_flight == 0
+
+
+async def test_cancelled_poll_is_sent_for_its_sharers():
+    """Test that polls sharing a cancelled poll send one of their own."""
+    queue = RequestQueue(max_in_flight=1)
+    release = asyncio.Event()
+    sent = []
+
+    async def blocker():
+        await release.wait()
+
+    def poll(name):
+        async def _poll():
+            sent.append(name)
+            return {"T": "200"}
+
+        return _poll
+
+    first = asyncio.ensure_future(queue.async_run(PRIORITY_POLL, blocker))
+    await asyncio.sleep(0)
+    polls = [
+        asyncio.ensure_future(
+            queue.async_run(PRIORITY_POLL, poll(f"poll {i}"), key="device")
+        )
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    polls[0].cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await polls[0]
+
+    release.set()
+    assert await asyncio.gather(*polls[1:]) == [{"T": "200"}] * 2
+    await first
+    assert sent == ["poll 1"]
+    assert queue.in_flight == 0
@@ -0,0 +1,42 @@
+"""Test eldom weekly program codec."""
+import pytest
+from custom_components.eldom.schedule import RAW_LENGTH
+from custom_components.eldom.schedule import WeeklyProgram
+
+
+def test_round_trip():
+    """Test that a program decodes to periods and encodes back."""
+    program = WeeklyProgram.from_raw("0" * RAW_LENGTH).replace(
+        {"monday": ["06:00-08:30", "17:00-22:00"], "sunday": ["00:00-24:00"]}
+    )
+
+    assert program.as_dict()["monday"] == ["06:00-08:30", "17:00-22:00"]
+    assert program.as_dict()["tuesday"] == []
+    assert program.as_dict()["sunday"] == ["00:00-24:00"]
+    assert WeeklyProgram.from_raw(program.to_raw()) == program
+    assert WeeklyProgram.from_raw(program.to_raw().lower()) == program
+
+
+def test_changed_days():
+    """Test that only the days that differ are reported."""
+    program = WeeklyProgram.from_raw("0" * RAW_LENGTH).replace(
+        {"monday": ["06:00-08:00"]}
+    )
+
+    assert program.replace({"monday": ["06:00-08:00"]}).changed_days(program) == []
+    assert program.replace(
+        {"monday": ["06:00-08:00"], "friday": ["12:00-13:00"]}
+    ).changed_days(program) == ["friday"]
+
+
+@pytest.mark.parametrize("period", ["06:15-08:00", "08:00-06:00", "6-8", "06:00-25:00"])
+def test_invalid_periods(period):
+    """Test that periods off the half-hour grid are rejected."""
+    with pytest.raises(ValueError):
+        WeeklyProgram.parse_periods([period])
+
+
+def test_invalid_raw():
+    """Test that an AutoTimeSet of another length is rejected."""
+    with pytest.raises(ValueError):
+        WeeklyProgram.from_raw("00")
@@ -0,0 +1,97 @@
+"""Test eldom adaptive poll interval."""
+from datetime import timedelta
+
+import pytest
+from custom_components.eldom import scheduler
+from custom_components.eldom.scheduler import AdaptivePollInterval
+from custom_components.eldom.scheduler import FAST_POLLS_AFTER_COMMAND
+from custom_components.eldom.snapshot import EldomSnapshot
+
+MINIMUM = timedelta(seconds=30)
+MAXIMUM = timedelta(seconds=300)
+
+
+@pytest.fixture(name="no_jitter", autouse=True)
+def no_jitter_fixture(monkeypatch):
+    """Return the intervals without jitter."""
+    monkeypatch.setattr(scheduler, "JITTER", 0)
+
+
+def _snapshot(temperature: int = 200, heating: bool = True) -> EldomSnapshot:
+    return EldomSnapshot(
+        {
+            "T": f"{temperature:03d}",
+            "TSet": "220",
+            "Operation": "16" if heating else "0",
+            "Lock": "0",
+            "Antifrost": "0",
+        }
+    )
+
+
+def _seconds(interval: timedelta) -> float:
+    return interval.total_seconds()
+
+
+def test_backs_off_while_idle_up_to_the_maximum():
+    """Test that stable readings stretch the interval, clamped to the maximum."""
+    intervals = AdaptivePollInterval(MINIMUM, MAXIMUM)
+
+    seconds = [_seconds(intervals.next_interval(_snapshot())) for _ in range(8)]
+
+    assert seconds[:4] == [45, 67.5, 101.25, 151.875]
+    assert seconds[-2:] == [300, 300]
+
+
+def test_speeds_up_after_a_change():
+    """Test that changed readings, operations or commands poll at the minimum."""
+    intervals = AdaptivePollInterval(MINIMUM, MAXIMUM)
+    for _ in range(5):
+        intervals.next_interval(_snapshot())
+
+    assert _seconds(intervals.next_interval(_snapshot(temperature=201))) == 30
+    assert _seconds(intervals.next_interval(_snapshot(temperature=201))) == 45
+    assert _seconds(intervals.next_interval(_snapshot(201, heating=False))) == 30
+
+    intervals.command_sent()
+    seconds = [
+        _seconds(intervals.next_interval(_snapshot(201, heating=False)))
+        for _ in range(FAST_POLLS_AFTER_COMMAND + 1)
+    ]
+    assert seconds == [30] * FAST_POLLS_AFTER_COMMAND + [300]
+
+
+def test_heater_off_polls_at_the_maximum():
+    """Test that a heater staying off is polled at the maximum."""
+    intervals = AdaptivePollInterval(MINIMUM, MAXIMUM)
+
+    assert _seconds(intervals.next_interval(_snapshot(heating=False))) == 300
+    assert _seconds(intervals.next_interval(_snapshot(199, heating=False))) == 300
+
+
+def test_failures_back_off_and_reset():
+    """Test that failed polls double the interval, and a success resets it."""
+    intervals = AdaptivePollInterval(MINIMUM, MAXIMUM)
+
+    seconds = [_seconds(intervals.poll_failed()) for _ in range(6)]
+    assert seconds == [30, 60, 120, 240, 300, 300]
+
+    intervals.next_interval(_snapshot())
+    assert _seconds(intervals.poll_failed()) == 30
+
+
+def test_clamps():
+    """Test that a maximum below the minimum is raised to the minimum."""
+    intervals = AdaptivePollInterval(MINIMUM, timedelta(seconds=10))
+    assert _seconds(intervals.next_interval(_snapshot())) == 30
+    assert _seconds(intervals.poll_failed()) == 30
+
+
+def test_jitter_stays_within_the_bounds(monkeypatch):
+    """Test that jittered intervals never leave the minimum and maximum."""
+    monkeypatch.setattr(scheduler, "JITTER", 0.5)
+    intervals = AdaptivePollInterval(MINIMUM, MAXIMUM)
+
+    for _ in range(50):
+        assert 30 <= _seconds(intervals.next_interval(_snapshot())) <= 300
+        assert 30 <= _seconds(intervals.poll_failed()) <= 300
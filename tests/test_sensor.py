@@ -0,0 +1,50 @@
+"""Test eldom sensors."""
+from custom_components.eldom import async_setup_entry
+from custom_components.eldom.const import DOMAIN
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_ENTRY_DATA
+
+
+async def test_sensor_units_and_state_classes(hass, bypass_get_data):
+    """Test that sensors expose their unit and state class to Home Assistant."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.heater_0_temperature")
+    assert state.state == "19.5"
+    assert state.attributes[ATTR_UNIT_OF_MEASUREMENT] == "°C"
+    assert state.attributes["state_class"] == "measurement"
+
+    state = hass.states.get("sensor.heater_0_estimated_energy")
+    assert state.attributes[ATTR_UNIT_OF_MEASUREMENT] == "kWh"
+    assert state.attributes["state_class"] == "total_increasing"
+
+
+async def test_metric_sensors(hass, bypass_get_data):
+    """Test the diagnostic metric sensors, once enabled."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_ENTRY_DATA, entry_id="test")
+    config_entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+    for key in ("api_calls", "getstatus_latency"):
+        registry.async_get_or_create(
+            "sensor",
+            DOMAIN,
+            f"uuid-0000_{key}",
+            suggested_object_id=f"heater_0_{key}",
+            config_entry=config_entry,
+        )
+    assert await async_setup_entry(hass, config_entry)
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.heater_0_api_calls")
+    assert state.state == "0"
+    assert state.attributes["state_class"] == "total_increasing"
+
+    state = hass.states.get("sensor.heater_0_getstatus_latency")
+    assert state.attributes[ATTR_UNIT_OF_MEASUREMENT] == "s"
+    assert state.attributes["state_class"] == "measurement"
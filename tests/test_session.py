@@ -0,0 +1,13 @@
+"""Test the eldom HTTP session."""
+import asyncio
+
+from custom_components.eldom.session import async_get_session
+
+
+async def test_entries_set_up_in_parallel_share_one_session(hass):
+    """Test that concurrent first uses create a single session."""
+    sessions = await asyncio.gather(*[async_get_session(hass) for _ in range(3)])
+
+    assert all(session is sessions[0] for session in sessions)
+    assert await async_get_session(hass) is sessions[0]
+    await sessions[0].close()
@@ -0,0 +1,45 @@
+"""Test eldom snapshot decoding."""
+from custom_components.eldom.snapshot import EldomSnapshot
+from custom_components.eldom.snapshot import Operation
+
+STATUS = {"T": "215", "Operation": "16"}
+PARAMETERS = {
+    "TSet": "220",
+    "ID": "device",
+    "Lock": "0",
+    "Rate1": "1",
+    "Rate2": "2",
+    "Antifrost": "1",
+    "AutoTimeSet": "schedule",
+    "SystemSettings": "settings",
+    "Req": "GetParams",
+}
+
+
+def test_snapshot_decodes_once():
+    """Test the typed fields of a snapshot."""
+    snapshot = EldomSnapshot.from_responses(STATUS, PARAMETERS)
+
+    assert snapshot.temperature == 215
+    assert snapshot.setpoint == 220
+    assert snapshot.operation is Operation.HEAT
+    assert snapshot.is_heating
+    assert not snapshot.lock
+    assert snapshot.antifrost
+    assert "Req" not in snapshot.as_dict()
+
+
+def test_snapshot_merge_and_parameters():
+    """Test that merging builds a new snapshot and leaves the old one alone."""
+    snapshot = EldomSnapshot.from_responses(STATUS, PARAMETERS)
+    merged = snapshot.merge({"Operation": "0", "TSet": "180", "Unknown": "x"})
+
+    assert snapshot.is_heating and snapshot.setpoint == 220
+    assert merged.operation is Operation.OFF
+    assert merged.setpoint == 180
+    assert "Unknown" not in merged.as_dict()
+
+    parameters = merged.parameters()
+    assert parameters["TSet"] == "180"
+    assert parameters["CRC"] == "00000000"
+    assert "T" not in parameters and "Operation" not in parameters
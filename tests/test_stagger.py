@@ -0,0 +1,57 @@
+"""Test the poll stagger shared by every eldom entry."""
+import asyncio
+from unittest.mock import patch
+
+from custom_components.eldom.stagger import PollStagger
+from custom_components.eldom.stagger import RATE_WINDOW
+
+
+def test_phases_are_spread_evenly():
+    """Test that every heater polls on its own share of the period."""
+    stagger = PollStagger()
+    for key in ("a", "b", "c", "d"):
+        stagger.register(key)
+
+    with patch("custom_components.eldom.stagger.time.time", return_value=1000.0):
+        delays = [stagger.delay(key, 30, 20) for key in ("a", "b", "c", "d")]
+        assert delays == [40, 45, 30, 35]
+        assert stagger.delay("unknown", 30, 20) == 30
+
+        stagger.unregister("c")
+        stagger.unregister("d")
+        assert [stagger.delay(key, 0, 20) for key in ("a", "b")] == [0, 10]
+
+
+def test_rates_over_the_window():
+    """Test the polls and requests per second."""
+    with patch("custom_components.eldom.stagger.time.monotonic", return_value=0.0):
+        stagger = PollStagger()
+        stagger.record_poll(2)
+        stagger.record_poll(1)
+        assert stagger.polls_per_second == 2 / RATE_WINDOW
+        assert stagger.requests_per_second == 3 / RATE_WINDOW
+    with patch(
+        "custom_components.eldom.stagger.time.monotonic", return_value=RATE_WINDOW - 1
+    ):
+        stagger.record_poll(1)
+        assert stagger.requests_per_second == 4 / RATE_WINDOW
+    with patch(
+        "custom_components.eldom.stagger.time.monotonic", return_value=RATE_WINDOW
+    ):
+        assert stagger.requests_per_second == 1 / RATE_WINDOW
+
+
+async def test_global_in_flight_limit():
+    """Test that polls beyond the limit wait for a slot."""
+    stagger = PollStagger(max_in_flight=2)
+    peak = 0
+
+    async def _poll():
+        nonlocal peak
+        async with stagger:
+            peak = max(peak, stagger.in_flight)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*[_poll() for _ in range(5)])
+    assert peak == 2
+    assert stagger.in_flight == 0